@@ -0,0 +1,81 @@
+# Compare utils.dsp_kernels with the librosa calls it replaces
+#
+#   python -m benchmarks.dsp_kernels_benchmark [audio files...]
+#
+# Without files, 30 s of synthetic audio (tones plus noise) is used.
+import argparse
+import time
+
+import numpy as np
+
+from utils import dsp_kernels
+
+SAMPLE_RATE = 22050
+
+
+def synthetic_signal(seconds=30, sr=SAMPLE_RATE, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sr)) / sr
+    y = 0.4 * np.sin(2 * np.pi * 220 * t) + 0.2 * np.sin(2 * np.pi * 1760 * t * (1 + 0.1 * t / seconds))
+    y += 0.05 * rng.standard_normal(len(t))
+    return y.astype(np.float32)
+
+
+def with_librosa(librosa, y, sr):
+    return {
+        "rms": librosa.feature.rms(y=y)[0],
+        "spectral_centroid": librosa.feature.spectral_centroid(y=y, sr=sr)[0],
+        "spectral_rolloff": librosa.feature.spectral_rolloff(y=y, sr=sr)[0],
+        "zero_crossing_rate": librosa.feature.zero_crossing_rate(y)[0],
+    }
+
+
+def with_kernels(y, sr):
+    return dsp_kernels.frame_descriptors(y, sr)[0]
+
+
+def best_of(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - started)
+    return min(times), result
+
+
+def compare(name, y, sr, repeats):
+    import librosa
+
+    with_librosa(librosa, y, sr)  # warm up caches and numba
+    librosa_time, expected = best_of(lambda: with_librosa(librosa, y, sr), repeats)
+    kernel_time, actual = best_of(lambda: with_kernels(y, sr), repeats)
+    print(f"[BENCH] {name}: librosa {librosa_time * 1000:.1f} ms, kernels {kernel_time * 1000:.1f} ms "
+          f"({librosa_time / kernel_time:.1f}x)")
+    for key, reference in expected.items():
+        value = actual[key]
+        if value.shape != reference.shape:
+            print(f"[ERROR] {key}: shape {value.shape} vs librosa {reference.shape}")
+            continue
+        scale = max(float(np.max(np.abs(reference))), 1e-12)
+        error = float(np.max(np.abs(value - reference))) / scale
+        mean_error = abs(float(np.mean(value)) - float(np.mean(reference))) / scale
+        print(f"        {key:<20} max rel. diff {error:.2e}, mean rel. diff {mean_error:.2e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark utils.dsp_kernels against librosa.")
+    parser.add_argument("files", nargs="*", help="audio files to analyse (first 30 s)")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    if not args.files:
+        compare("synthetic 30 s", synthetic_signal(), SAMPLE_RATE, args.repeats)
+        return
+    import librosa
+    for path in args.files:
+        y, sr = librosa.load(path, duration=30)
+        compare(path, y, sr, args.repeats)
+
+
+if __name__ == "__main__":
+    main()
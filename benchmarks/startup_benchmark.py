@@ -0,0 +1,69 @@
+# Time from interpreter start to the setup window being drawn
+#
+#   python -m benchmarks.startup_benchmark --runs 5
+#
+# Each run is a fresh interpreter, so module imports are measured cold (as far
+# as the OS page cache allows). The run fails if any of the heavy modules that
+# the setup window should not need were imported.
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must only load once analysis or playback actually starts
+HEAVY_MODULES = ("librosa", "sklearn", "pygame")
+
+_CHILD = r"""
+import json, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+window = None
+try:
+    root = main.build_setup_window()
+    root.update()
+    window = time.perf_counter() - started
+    root.destroy()
+except Exception as e:  # no display available
+    print(f"[BENCH] No window: {e}", file=sys.stderr)
+print(json.dumps({
+    "import": imported - started,
+    "window": window,
+    "heavy": sorted(m for m in %r if m in sys.modules),
+}))
+""" % (HEAVY_MODULES,)
+
+
+def run_once():
+    """Start a fresh interpreter, build the setup window and return its timings."""
+    result = subprocess.run([sys.executable, "-c", _CHILD], cwd=REPO_ROOT,
+                            capture_output=True, text=True, check=True)
+    if result.stderr.strip():
+        print(result.stderr.strip(), file=sys.stderr)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure time-to-first-window of the setup screen.")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters to start")
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+    imports = [r["import"] * 1000 for r in runs]
+    print(f"[BENCH] import main: median {statistics.median(imports):.0f} ms, max {max(imports):.0f} ms")
+    windows = [r["window"] * 1000 for r in runs if r["window"] is not None]
+    if windows:
+        print(f"[BENCH] first window: median {statistics.median(windows):.0f} ms, max {max(windows):.0f} ms")
+
+    heavy = sorted({m for r in runs for m in r["heavy"]})
+    if heavy:
+        print(f"[ERROR] Heavy modules imported before the window appeared: {', '.join(heavy)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
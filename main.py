@@ -1,9 +1,11 @@
 import os
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-from utils.tag_manager import load_tags, save_tags
-from utils.mood_detector import process_folder
-from ui.player_gui import launch_player
+from utils.tag_manager import ANALYSIS_FILENAME, CORRECTIONS_FILENAME, MOOD_TAGS_FILENAME, load_tags, save_tags
+from utils.metadata import METADATA_FILENAME, scan_metadata
+from utils.content_id import content_id, content_index
+from utils.library import add_root, library_dir, library_files, load_roots
+from utils.daemon_client import connect as connect_daemon
 import logging
 from datetime import datetime
 
@@ -51,12 +53,21 @@ def validate_folder(folder_path, audio_extensions=(".mp3", ".wav")):
 
 def process_mood_tags(folder_path, force_reprocess=False):
     """Load or generate mood tags for the selected folder."""
-    tag_file = os.path.join(folder_path, "mood_tags.json")
+    tag_file = os.path.join(folder_path, MOOD_TAGS_FILENAME)
     if force_reprocess or not os.path.exists(tag_file):
         logger.info("No mood_tags.json found or reprocessing requested. Processing songs in %s", folder_path)
         try:
-            mood_tags = process_folder(folder_path)
+            # librosa and scikit-learn take seconds to import, so only load them when tagging
+            from utils.mood_detector import process_folder
+            analysis = {}
+            mood_tags = process_folder(folder_path, analysis)
+            # Keep the user's manual retags across reprocessing
+            corrections_file = os.path.join(folder_path, CORRECTIONS_FILENAME)
+            if os.path.exists(corrections_file):
+                corrections = load_tags(corrections_file)
+                mood_tags.update({f: m for f, m in corrections.items() if f in mood_tags})
             save_tags(tag_file, mood_tags)
+            save_tags(os.path.join(folder_path, ANALYSIS_FILENAME), analysis)
             logger.info("Mood tagging complete. Saved to %s", tag_file)
         except Exception as e:
             logger.error("Failed to process mood tags: %s", e)
@@ -68,13 +79,147 @@ def process_mood_tags(folder_path, force_reprocess=False):
         except Exception as e:
             logger.error("Failed to load mood tags: %s", e)
             return None
+        try:
+            follow_renames(folder_path, mood_tags)
+        except Exception as e:
+            # Renamed files are just tagged again as new ones; the folder still opens
+            logger.error("Failed to carry tags over to renamed files: %s", e)
     return mood_tags
 
-def main():
-    """Main function to initialize and run the music player."""
+def follow_renames(folder_path, mood_tags, present=None):
+    """
+    Carry tags, analysis and manual retags over to files that were renamed
+    (or copied) since the folder was last tagged, matching them by content
+    id so nothing is decoded. Updates mood_tags in place and saves changes.
+    present lists the files to check, by default the MP3s in folder_path.
+    """
+    if present is None:
+        present = [f for f in os.listdir(folder_path) if f.endswith(".mp3")]
+    present = set(present)
+    untagged = sorted(present - set(mood_tags))
+    if not untagged:
+        return
+    analysis = load_analysis(folder_path)
+    known = content_index(analysis)
+    if not known:
+        return
+    corrections_file = os.path.join(folder_path, CORRECTIONS_FILENAME)
+    corrections = load_tags(corrections_file) if os.path.exists(corrections_file) else {}
+    followed = 0
+    renamed = set()
+    for filename in untagged:
+        try:
+            source = known.get(content_id(os.path.join(folder_path, filename)))
+        except OSError as e:
+            logger.warning("Could not read %s: %s", filename, e)
+            continue
+        if source is None or source not in mood_tags:
+            continue
+        mood_tags[filename] = mood_tags[source]
+        analysis[filename] = dict(analysis[source])
+        if source in corrections:
+            corrections[filename] = corrections[source]
+        # Renamed rather than copied; tracks on an unmounted library folder stay
+        if source not in present and os.path.isdir(os.path.dirname(os.path.join(folder_path, source))):
+            renamed.add(source)
+        followed += 1
+    for source in renamed:
+        del mood_tags[source]
+        del analysis[source]
+        corrections.pop(source, None)
+    if followed:
+        save_tags(os.path.join(folder_path, MOOD_TAGS_FILENAME), mood_tags)
+        save_tags(os.path.join(folder_path, ANALYSIS_FILENAME), analysis)
+        if corrections:
+            save_tags(corrections_file, corrections)
+        logger.info("Kept tags for %d renamed or copied files", followed)
+
+def process_library(store_dir, force_reprocess=False):
+    """
+    Tag every track under the library's registered folders into the shared
+    store in store_dir. Only tracks the store doesn't know are analysed, and
+    those whose audio is already stored under another folder reuse it. With
+    force_reprocess every available track is analysed again; either way the
+    results are merged into the store, so tracks on unavailable folders keep
+    their tags. Returns (mood_tags, songs): the whole store, including tracks
+    on folders that are currently unavailable, and the tracks that can be
+    played now.
+    """
+    songs = library_files(load_roots(store_dir))
+    tag_file = os.path.join(store_dir, MOOD_TAGS_FILENAME)
+    try:
+        mood_tags = load_tags(tag_file) if os.path.exists(tag_file) else {}
+    except Exception as e:
+        logger.error("Failed to load library tags: %s", e)
+        return None, []
+    try:
+        follow_renames(store_dir, mood_tags, songs)
+    except Exception as e:
+        logger.error("Failed to carry tags over to renamed files: %s", e)
+    untagged = songs if force_reprocess else [song for song in songs if song not in mood_tags]
+    if untagged:
+        logger.info("Processing %d %s tracks in the library", len(untagged),
+                    "available" if force_reprocess else "new")
+        try:
+            from utils.mood_detector import process_files
+            analysis = load_analysis(store_dir)
+            # Reprocessing must not reuse the stored results it is meant to replace
+            known = None if force_reprocess else (mood_tags, analysis)
+            new_tags = process_files(store_dir, untagged, analysis, known=known)
+            corrections_file = os.path.join(store_dir, CORRECTIONS_FILENAME)
+            if os.path.exists(corrections_file):
+                corrections = load_tags(corrections_file)
+                new_tags.update({f: m for f, m in corrections.items() if f in new_tags})
+            mood_tags.update(new_tags)
+            save_tags(tag_file, mood_tags)
+            save_tags(os.path.join(store_dir, ANALYSIS_FILENAME), analysis)
+            logger.info("Library tagging complete. Saved to %s", tag_file)
+        except Exception as e:
+            logger.error("Failed to process library: %s", e)
+            return None, []
+    return mood_tags, [song for song in songs if song in mood_tags]
+
+def load_analysis(folder_path):
+    """Load per-track BPM/key/features saved during mood tagging, if any."""
+    analysis_file = os.path.join(folder_path, ANALYSIS_FILENAME)
+    if not os.path.exists(analysis_file):
+        return {}
+    try:
+        return load_tags(analysis_file)
+    except Exception as e:
+        logger.warning("Ignoring unreadable analysis file %s: %s", analysis_file, e)
+        return {}
+
+def process_metadata(folder_path, filenames, keep_missing=False):
+    """
+    Load cached track metadata and scan any new or changed files. With
+    keep_missing, cached entries for files not in filenames (tracks on an
+    unavailable library folder) are kept instead of dropped.
+    """
+    metadata_file = os.path.join(folder_path, METADATA_FILENAME)
+    cached = {}
+    if os.path.exists(metadata_file):
+        try:
+            cached = load_tags(metadata_file)
+        except Exception as e:
+            logger.warning("Ignoring unreadable metadata cache %s: %s", metadata_file, e)
+    metadata = scan_metadata(folder_path, filenames, cached)
+    if keep_missing:
+        listed = set(filenames)
+        metadata.update((f, entry) for f, entry in cached.items() if f not in listed)
+    if metadata != cached:
+        try:
+            save_tags(metadata_file, metadata)
+            logger.info("Saved metadata for %d tracks to %s", len(metadata), metadata_file)
+        except Exception as e:
+            logger.error("Failed to save metadata: %s", e)
+    return metadata
+
+def build_setup_window():
+    """Create the folder-selection window and return its root, ready for mainloop()."""
     root = tk.Tk()
     root.title("Smart Music Player - Setup")
-    root.geometry("400x300")
+    root.geometry("400x340")
     root.configure(bg="#f0f0f0")
     root.resizable(False, False)
 
@@ -107,10 +252,57 @@ def main():
             status_label.config(text="")
             return
 
+        # Read durations and tags once so the player never has to probe files
+        status_label.config(text="Reading track metadata...")
+        root.update()
+        metadata = process_metadata(folder_path, list(mood_tags.keys()))
+
         # Launch player
         logger.info("Launching player with folder: %s, mood_tags: %s", folder_path, list(mood_tags.keys()))
+        analysis = load_analysis(folder_path)
         root.destroy()  # Close setup window
-        launch_player(folder_path, mood_tags)
+        from ui.player_gui import launch_player  # pygame and the player UI load only now
+        launch_player(folder_path, mood_tags, metadata, analysis)
+
+    def open_library(add_folder=False):
+        """Optionally register another folder, then tag and play the whole library."""
+        store_dir = library_dir()
+        if add_folder or not load_roots(store_dir):
+            folder_path = filedialog.askdirectory(title="Add a music folder to the library")
+            if not folder_path:
+                return
+            if not validate_folder(folder_path):
+                messagebox.showerror("Error", "Selected folder contains no audio files (MP3/WAV).")
+                return
+            root_path = add_root(store_dir, folder_path)
+            logger.info("Added %s to the library in %s", root_path, store_dir)
+
+        create_default_cover()
+        status_label.config(text="Processing library, please wait...")
+        select_btn.config(state="disabled")
+        library_btn.config(state="disabled")
+        add_folder_btn.config(state="disabled")
+        root.update()
+
+        mood_tags, songs = process_library(store_dir, reprocess_var.get())
+        reprocess_var.set(0)
+        if mood_tags is None or not songs:
+            messagebox.showerror("Error", "No playable tracks in the library. Check log for details.")
+            for button in (select_btn, library_btn, add_folder_btn):
+                button.config(state="normal")
+            status_label.config(text="")
+            return
+
+        status_label.config(text="Reading track metadata...")
+        root.update()
+        metadata = process_metadata(store_dir, songs, keep_missing=True)
+
+        logger.info("Launching player with library %s: %d tracks in %d folders",
+                    store_dir, len(songs), len(load_roots(store_dir)))
+        analysis = load_analysis(store_dir)
+        root.destroy()
+        from ui.player_gui import launch_player
+        launch_player(store_dir, mood_tags, metadata, analysis, roots=load_roots(store_dir), songs=songs)
 
     def on_closing():
         """Handle window close event."""
@@ -150,6 +342,25 @@ def main():
     )
     select_btn.pack(pady=10)
 
+    library_frame = tk.Frame(main_frame, bg="#f0f0f0")
+    library_frame.pack(pady=5)
+    library_btn = tk.Button(
+        library_frame,
+        text="Open Library",
+        command=open_library,
+        font=("Helvetica", 10),
+        relief="flat"
+    )
+    library_btn.pack(side="left", padx=5)
+    add_folder_btn = tk.Button(
+        library_frame,
+        text="Add Folder to Library",
+        command=lambda: open_library(add_folder=True),
+        font=("Helvetica", 10),
+        relief="flat"
+    )
+    add_folder_btn.pack(side="left", padx=5)
+
     reprocess_var = tk.BooleanVar()
     tk.Checkbutton(
         main_frame,
@@ -172,7 +383,18 @@ def main():
     # Bind window close event
     root.protocol("WM_DELETE_WINDOW", on_closing)
 
-    root.mainloop()
+    return root
+
+def main():
+    """Main function to initialize and run the music player."""
+    # A running player daemon already has the library loaded: just attach to it
+    client = connect_daemon(timeout=1.0)
+    if client is not None:
+        logger.info("Attaching to the player daemon at %s", client.address)
+        from ui.remote_player import launch_remote
+        launch_remote(client)
+        return
+    build_setup_window().mainloop()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
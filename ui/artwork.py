@@ -0,0 +1,104 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image, ImageFilter, ImageTk
+
+ART_SIZE = (320, 320)
+# Rendered covers kept in memory (about 300 KB each)
+CACHE_SIZE = 64
+WORKERS = 2
+
+
+def render_placeholder(size=ART_SIZE):
+    """Grey radial gradient shown when nothing is playing."""
+    w, h = size
+    y, x = np.mgrid[0:h, 0:w]
+    distance = np.hypot(x - w // 2, y - h // 2)
+    brightness = np.maximum(0, 1 - distance / (w // 2))
+    grey = (45 + brightness * 20).astype(np.uint8)
+    return Image.fromarray(grey, "L").convert("RGB")
+
+
+def render_cover(song_path, extract_album_art, default_path, size=ART_SIZE):
+    """The player's cover look: the art resized and blended over a blurred copy of itself."""
+    img = extract_album_art(song_path, default_path)
+    if img is None:
+        try:
+            img = Image.open(default_path)
+        except Exception:
+            return Image.new('RGB', size, color='#2d2d2d')
+    # Let the JPEG decoder scale down while decoding (a 3000x3000 cover decodes at 375x375)
+    img.draft("RGB", size)
+    img = img.convert("RGB").resize(size, Image.Resampling.LANCZOS)
+    blurred = img.filter(ImageFilter.GaussianBlur(radius=20))
+    return Image.blend(blurred, img, 0.8)
+
+
+class ArtworkLoader:
+    """
+    Decodes, resizes and blurs covers on a small worker pool and hands the
+    result through the UI update bus to on_ready(photo) on the Tk thread,
+    where the PhotoImage is made.
+    Only the most recent request is delivered: asking for a new cover cancels
+    older requests that haven't started and discards those already running,
+    so skipping through tracks never queues up stale work.
+    """
+
+    def __init__(self, ui_bus, extract_album_art, default_path, workers=WORKERS):
+        self._ui_bus = ui_bus
+        self._extract = extract_album_art
+        self._default_path = default_path
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="artwork")
+        self._cache = OrderedDict()  # song path -> rendered PIL image
+        self._cache_lock = threading.Lock()
+        self._generation = 0
+        self._future = None
+        self._on_ready = None
+
+    def request(self, song_path, on_ready):
+        """Show the cover for song_path (None for the placeholder) via on_ready; call on the Tk thread."""
+        self._generation += 1
+        self._on_ready = on_ready
+        if self._future is not None:
+            self._future.cancel()
+        with self._cache_lock:
+            cached = self._cache.get(song_path)
+            if cached is not None:
+                self._cache.move_to_end(song_path)
+        if cached is not None:
+            self._future = None
+            on_ready(ImageTk.PhotoImage(cached))
+            return
+        self._future = self._executor.submit(self._render, self._generation, song_path)
+
+    def _render(self, generation, song_path):
+        if generation != self._generation:
+            return  # superseded while queued
+        try:
+            if song_path is None:
+                img = render_placeholder()
+            else:
+                img = render_cover(song_path, self._extract, self._default_path)
+        except Exception as e:
+            print(f"Error loading album art for {song_path}: {e}")
+            img = Image.new('RGB', ART_SIZE, color='#2d2d2d')
+        else:
+            with self._cache_lock:
+                self._cache[song_path] = img
+                while len(self._cache) > CACHE_SIZE:
+                    self._cache.popitem(last=False)
+        self._ui_bus.post("album_art", self._deliver, generation, img)
+
+    def _deliver(self, generation, img):
+        if generation == self._generation:
+            self._on_ready(ImageTk.PhotoImage(img))
+
+    def forget(self, song_path):
+        """Drop a cached cover, e.g. after the file changed."""
+        with self._cache_lock:
+            self._cache.pop(song_path, None)
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
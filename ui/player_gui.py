@@ -1,15 +1,22 @@
 import os
 import tkinter as tk
-from tkinter import messagebox, ttk
-import random
-from PIL import Image, ImageTk, ImageFilter
-from pygame import mixer
+from tkinter import messagebox, simpledialog, ttk
+from PIL import Image
 import threading
-import time
-import mutagen
-from mutagen.mp3 import MP3
-from mutagen.flac import FLAC
-from mutagen.mp4 import MP4
+from utils.metadata import METADATA_FILENAME, read_metadata
+from utils.tag_manager import ANALYSIS_FILENAME, CORRECTIONS_FILENAME, MOOD_TAGS_FILENAME, load_tags, save_tags
+from utils.library_watcher import LibraryWatcher
+from utils.analysis_scheduler import AnalysisScheduler
+from utils.fingerprint import FingerprintIndex, audio_fingerprint
+from utils.content_id import content_id, content_index
+from utils.search_index import SearchIndex
+from utils.daemon_client import DaemonError
+from utils.player_daemon import PlayerEngine
+from utils.similarity import SimilarityIndex
+from utils.sequencer import sequence_tracks
+from ui.artwork import ArtworkLoader
+from ui.update_bus import UIUpdateBus
+from ui.track_list import VirtualTrackList
 
 # Assuming extract_album_art is provided
 try:
@@ -21,24 +28,23 @@ except ImportError:
         except:
             return Image.new('RGB', (300, 300), color='#2d2d2d')
 
-mixer.init()
+# How many nearest tracks are reclassified after a manual retag
+RETAG_NEIGHBOURS = 50
+# How many songs ahead of the current one get analysed before anything else
+UPCOMING_ANALYSIS = 10
 
-def get_song_duration(file_path):
-    """Get the duration of an audio file in seconds"""
-    try:
-        audio_file = mutagen.File(file_path)
-        if audio_file is not None:
-            return int(audio_file.info.length)
-        return 180  # Default 3 minutes if can't determine
-    except:
-        return 180
-
-def launch_player(folder_path, mood_tags):
+def launch_player(folder_path, mood_tags, metadata=None, analysis=None, roots=None, songs=None):
+    # Tags and analysis are saved in folder_path and keyed by path relative to it. For a
+    # library spanning several roots that is the shared store, keyed by absolute path,
+    # and songs lists the tracks whose folders are currently available.
     window = tk.Tk()
     window.title("Smart Music Player")
     window.geometry("900x800")
     window.configure(bg="#0a0a0a")
     window.resizable(True, True)
+    # Worker threads never touch Tk; they post to this bus, which applies updates once per frame
+    ui_bus = UIUpdateBus(window)
+    ui_bus.start()
     
     # Apply blur effect to window (Windows only)
     try:
@@ -48,16 +54,31 @@ def launch_player(folder_path, mood_tags):
 
     # Store current image and song list
     current_image = None
-    current_index = [0]
-    original_songs = list(mood_tags.keys())
-    filtered_songs = original_songs.copy()
-    is_playing = [False]
-    is_paused = [False]
+    metadata = metadata or {}
+    analysis = analysis or {}
+    corrections_file = os.path.join(folder_path, CORRECTIONS_FILENAME)
+    try:
+        corrections = load_tags(corrections_file) if os.path.exists(corrections_file) else {}
+    except Exception as e:
+        print(f"[ERROR] Ignoring unreadable {corrections_file}: {e}")
+        corrections = {}
+    # Playback (the mixer, up-next queue and history, shuffle, repeat, moving on when a track
+    # ends) runs in the same engine the daemon uses; this window adds views and display on top.
+    # The engine opens the audio device, so importing this module stays cheap.
+    engine = PlayerEngine(folder_path, mood_tags, metadata, analysis, songs=songs,
+                          on_track=lambda song, generation: track_started(song, generation))
+    original_songs = engine.songs  # kept current by engine.add_song/remove_song
+    filtered_songs = engine.view  # the list the engine plays through
+    filtered_set = [None]  # membership of filtered_songs, built when a search needs it
+    search_index = [None]
+    similarity_index = [None]
+    indexes_ready = [False]
+    index_changes = set()  # songs changed while the startup build runs, re-indexed once it is done
+    mood_corrector = [None]  # MoodCorrector, built on the first retag from the saved model if any
     song_length = [0]
-    current_position = [0]
-    repeat_mode = [0]  # 0: no repeat, 1: repeat all, 2: repeat one
-    is_shuffled = [False]
-    update_thread = [None]
+    shown_generation = [0]  # engine generation of the track on screen; posts for older ones are dropped
+    auto_dj = [False]
+    progress_stop = threading.Event()
 
     # Enhanced color scheme with blur theme
     colors = {
@@ -148,82 +169,160 @@ def launch_player(folder_path, mood_tags):
         
         return canvas
 
-    def show_album_art(song_path):
+    def set_album_art(photo):
         nonlocal current_image
-        try:
-            if song_path is None:
-                # Create default album art with blur effect
-                img = Image.new('RGB', (320, 320), color='#2d2d2d')
-                # Add gradient effect
-                for y in range(320):
-                    for x in range(320):
-                        distance = ((x - 160) ** 2 + (y - 160) ** 2) ** 0.5
-                        brightness = max(0, 1 - distance / 160)
-                        color = int(45 + brightness * 20)
-                        img.putpixel((x, y), (color, color, color))
-                
-                current_image = ImageTk.PhotoImage(img)
-                album_art_label.configure(image=current_image, bg=colors['card_bg'])
-                album_art_label.image = current_image
-                return
-
-            img = extract_album_art(song_path, os.path.join("assets", "default_cover.jpg"))
-            if img is None:
-                try:
-                    img = Image.open(os.path.join("assets", "default_cover.jpg"))
-                except:
-                    img = Image.new('RGB', (320, 320), color='#2d2d2d')
-
-            # Resize and apply subtle blur effect
-            img = img.resize((320, 320), Image.Resampling.LANCZOS)
-            
-            # Create a blurred background version
-            blurred = img.filter(ImageFilter.GaussianBlur(radius=20))
-            
-            # Blend original with blurred for glass effect
-            img = Image.blend(blurred, img, 0.8)
-            
-            current_image = ImageTk.PhotoImage(img)
-            album_art_label.configure(image=current_image, bg=colors['card_bg'])
-            album_art_label.image = current_image
-        except Exception as e:
-            print(f"Error loading album art for {song_path}: {e}")
-            img = Image.new('RGB', (320, 320), color='#2d2d2d')
-            current_image = ImageTk.PhotoImage(img)
-            album_art_label.configure(image=current_image, bg=colors['card_bg'])
-            album_art_label.image = current_image
+        current_image = photo
+        album_art_label.configure(image=current_image, bg=colors['card_bg'])
+        album_art_label.image = current_image
 
-    def update_progress_bar():
-        """Update progress bar continuously while playing"""
-        while is_playing[0] and not is_paused[0]:
-            try:
-                current_position[0] += 1
-                if song_length[0] > 0:
-                    progress = min((current_position[0] / song_length[0]) * 100, 100)
-                    progress_var.set(progress)
-                    
-                    # Update time labels
-                    current_time = min(current_position[0], song_length[0])
-                    time_current_label.config(text=format_time(current_time))
-                    
-                    # Check if song ended
-                    if current_position[0] >= song_length[0]:
-                        window.after(100, handle_song_end)
-                        break
-                        
-                time.sleep(1)
-            except:
-                break
-
-    def handle_song_end():
-        """Handle what happens when a song ends"""
-        if repeat_mode[0] == 2:  # Repeat one
-            load_song(current_index[0])
-        elif repeat_mode[0] == 1:  # Repeat all
-            next_song()
+    def show_album_art(song_path):
+        """Render the cover (or the placeholder for None) off the Tk thread and show it when ready"""
+        artwork.request(song_path, set_album_art)
+
+    def display_title(song):
+        """Tag title if known, otherwise the file name without extension"""
+        return (metadata.get(song) or {}).get("title") or os.path.splitext(os.path.basename(song))[0]
+
+    def track_values(song):
+        """Row values for the track list"""
+        bpm = (analysis.get(song) or {}).get("bpm")
+        duration = (metadata.get(song) or {}).get("duration")
+        return (
+            display_title(song),
+            mood_tags.get(song, ""),
+            f"{bpm:.0f}" if bpm else "",
+            format_time(duration) if duration else "",
+        )
+
+    def track_sort_key(song, column):
+        """Sort key for a track list column; missing numbers sort first"""
+        if column == "title":
+            return display_title(song).lower()
+        if column == "mood":
+            return mood_tags.get(song, "").lower()
+        if column == "bpm":
+            return (analysis.get(song) or {}).get("bpm") or 0
+        return (metadata.get(song) or {}).get("duration") or 0
+
+    def search_fields(song):
+        """Text a song can be found by in the search box"""
+        info = metadata.get(song) or {}
+        return (info.get("title"), info.get("artist"), info.get("album"),
+                mood_tags.get(song), os.path.splitext(os.path.basename(song))[0])
+
+    def build_indexes(songs):
+        """Build the search and similarity indexes off the main thread at startup"""
+        search = SearchIndex.build((song, search_fields(song)) for song in songs)
+        similarity = SimilarityIndex.build(
+            (song, analysis[song]["features"]) for song in songs
+            if (analysis.get(song) or {}).get("features"))
+        ui_bus.post("indexes", install_indexes, search, similarity)
+
+    def install_indexes(search, similarity):
+        """Start using the indexes from build_indexes and catch them up with changes made meanwhile (Tk thread)"""
+        search_index[0] = search
+        similarity_index[0] = similarity
+        indexes_ready[0] = True
+        for song in index_changes:
+            update_indexes(song)
+        index_changes.clear()
+
+    def update_indexes(song, similarity=True):
+        """Bring the indexes up to date with song's tags and features, or its removal (Tk thread)"""
+        if not indexes_ready[0]:
+            index_changes.add(song)
+            return
+        if song not in mood_tags:
+            search_index[0].remove(song)
+            if similarity_index[0] is not None:
+                similarity_index[0].remove(song)
+            return
+        search_index[0].add(song, search_fields(song))
+        features = (analysis.get(song) or {}).get("features")
+        if not similarity or not features:
+            return
+        if similarity_index[0] is None:
+            similarity_index[0] = SimilarityIndex.build([(song, features)])
         else:
-            # Just move to next song
-            next_song()
+            similarity_index[0].add(song, features)
+
+    def play_similar():
+        """Play the tracks that sound most like the current one, nearest first"""
+        nonlocal filtered_songs
+        if filtered_songs and not indexes_ready[0]:
+            messagebox.showinfo("Play Similar", "Still indexing the library, try again in a moment.")
+            return
+        if not filtered_songs or similarity_index[0] is None:
+            messagebox.showinfo("Play Similar", "No feature data available. Reprocess mood tags to enable this.")
+            return
+        current = engine.current
+        if current is None:
+            return
+        similar = [song for song, _ in similarity_index[0].most_similar(current, k=25)]
+        if not similar:
+            messagebox.showinfo("Play Similar", "No similar tracks found for this song.")
+            return
+        filtered_songs = [current] + similar
+        filtered_set[0] = None
+        engine.set_view(filtered_songs, current=current)
+        shuffle_btn.itemconfig(shuffle_circle, fill=colors['secondary'])
+        refresh_track_list()
+        next_song()
+
+    def refresh_track_list():
+        """Show the current mood filter, narrowed by the search box"""
+        query = search_var.get()
+        hits = search_index[0].search(query) if search_index[0] and query.strip() else None
+        if hits is None:
+            track_list.set_rows(filtered_songs)
+            return
+        if len(filtered_songs) != len(original_songs):
+            if filtered_set[0] is None:
+                filtered_set[0] = set(filtered_songs)
+            hits = [song for song in hits if song in filtered_set[0]]
+        track_list.set_rows(hits)
+
+    def on_search(*args):
+        if search_index[0] is None:
+            # Index still building; try again shortly
+            window.after(100, on_search)
+            return
+        refresh_track_list()
+
+    def play_from_list(song):
+        """Play a song picked in the track list"""
+        playback(engine.play, song)
+
+    def queue_selected(play_next=False):
+        """Add the song selected in the track list to the up-next queue"""
+        song = track_list.selected
+        if song is None:
+            return
+        engine.enqueue(song, next=play_next)
+        update_analysis_focus()
+        print(f"[QUEUED] {song}")
+
+    def update_progress_bar():
+        """Post the playback position once a second until the window closes (progress thread)"""
+        while not progress_stop.wait(1):
+            generation, state, position = engine.progress()
+            if state == "playing":
+                post_position(position, generation)
+
+    def show_position(seconds, generation=None):
+        """
+        Move the progress bar and elapsed time to seconds (Tk thread only). A position
+        stamped with the generation of a track that is no longer shown, or read before
+        playback stopped, arrived late and is ignored.
+        """
+        if generation is not None and (generation != shown_generation[0] or engine.state == "stopped"):
+            return
+        progress_var.set(min(seconds / song_length[0] * 100, 100) if song_length[0] > 0 else 0)
+        time_current_label.config(text=format_time(seconds))
+
+    def post_position(seconds, generation=None):
+        """show_position from any thread, coalesced with other position updates in the same frame"""
+        ui_bus.post("position", show_position, seconds, generation)
 
     def format_time(seconds):
         """Format seconds to MM:SS"""
@@ -231,160 +330,158 @@ def launch_player(folder_path, mood_tags):
         seconds = int(seconds % 60)
         return f"{minutes:02d}:{seconds:02d}"
 
-    def load_song(index):
-        nonlocal update_thread
-        if not filtered_songs:
-            messagebox.showwarning("No Songs", "No songs available to play.")
-            song_title_label.config(text="No song loaded")
-            artist_label.config(text="")
-            show_album_art(None)
-            return
-
-        if index >= len(filtered_songs):
-            current_index[0] = 0
-            index = 0
-
+    def track_started(song, generation):
+        """Engine callback, on whichever thread started the track (a button or the end of the last one)"""
+        # Keep background analysis off the disk and CPU while the track starts
+        analysis_scheduler.hold()
+        ui_bus.post("track", show_track, song, generation)
+
+    def show_track(song, generation):
+        """Show the track the engine is now playing (Tk thread only)"""
+        if generation < shown_generation[0]:
+            return  # a newer track is already on screen
+        shown_generation[0] = generation
+        song_length[0] = int(engine.duration(song))
+        song_name = os.path.splitext(os.path.basename(song))[0]
+        # Truncate long song names
+        if len(song_name) > 40:
+            song_name = song_name[:37] + "..."
+
+        song_title_label.config(text=song_name)
+        artist_label.config(text=f"Mood: {mood_tags[song]}")
+        time_total_label.config(text=format_time(song_length[0]) if song_length[0] else "--:--")
+
+        show_album_art(os.path.join(folder_path, song))
+        track_list.set_current(song)
+        update_analysis_focus()
+        update_play_button()
+
+        # Positions posted for the previous track carry its generation and are dropped from here on
+        show_position(0)
+
+    def update_play_button():
+        play_pause_btn_canvas.itemconfig(play_pause_text, text="⏸️" if engine.state == "playing" else "▶️")
+
+    def playback(command, *args):
+        """Run an engine command for a button; problems are shown instead of raised"""
         try:
-            song = filtered_songs[index]
-            full_path = os.path.join(folder_path, song)
-            
-            # Stop current update thread
-            is_playing[0] = False
-            if update_thread[0] and update_thread[0].is_alive():
-                update_thread[0].join(timeout=1)
-            
-            # Get dynamic song duration
-            song_length[0] = get_song_duration(full_path)
-            
-            mixer.music.load(full_path)
-            mixer.music.play()
-            
-            is_playing[0] = True
-            is_paused[0] = False
-            current_position[0] = 0
-            
-            # Update UI
-            song_name = os.path.splitext(song)[0]
-            # Truncate long song names
-            if len(song_name) > 40:
-                song_name = song_name[:37] + "..."
-            
-            song_title_label.config(text=song_name)
-            artist_label.config(text=f"Mood: {mood_tags[song]}")
-            time_total_label.config(text=format_time(song_length[0]))
-            
-            show_album_art(full_path)
-            current_index[0] = index
-            play_pause_btn_canvas.itemconfig(play_pause_text, text="⏸️")
-            
-            # Reset progress bar
-            progress_var.set(0)
-            time_current_label.config(text="00:00")
-            
-            # Start progress update thread
-            update_thread[0] = threading.Thread(target=update_progress_bar, daemon=True)
-            update_thread[0].start()
-            
+            command(*args)
+        except DaemonError as e:
+            messagebox.showwarning("No Songs", str(e))
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load song: {e}")
             song_title_label.config(text="Error loading song")
             artist_label.config(text="")
             show_album_art(None)
+        update_play_button()
 
     def next_song():
-        if not filtered_songs:
-            messagebox.showwarning("No Songs", "No songs available.")
-            return
-        
-        if repeat_mode[0] == 2:  # Repeat one
-            load_song(current_index[0])
-        else:
-            current_index[0] = (current_index[0] + 1) % len(filtered_songs)
-            load_song(current_index[0])
+        playback(engine.next)
 
     def prev_song():
-        if not filtered_songs:
-            messagebox.showwarning("No Songs", "No songs available.")
-            return
-        current_index[0] = (current_index[0] - 1) % len(filtered_songs)
-        load_song(current_index[0])
+        # Walk back through what was actually played; restart the song at the start of history
+        playback(engine.prev)
 
     def toggle_shuffle():
-        nonlocal filtered_songs
-        if is_shuffled[0]:
-            # Un-shuffle: restore original order
-            mood = mood_var.get().lower()
-            if mood == "all":
-                filtered_songs = original_songs.copy()
-            else:
-                filtered_songs = [s for s in original_songs if mood_tags[s].lower() == mood]
-            is_shuffled[0] = False
-            shuffle_btn.itemconfig(shuffle_circle, fill=colors['secondary'])
-        else:
-            # Shuffle
-            current_song = filtered_songs[current_index[0]] if filtered_songs else None
-            random.shuffle(filtered_songs)
-            if current_song and current_song in filtered_songs:
-                # Keep current song at current position
-                filtered_songs.remove(current_song)
-                filtered_songs.insert(current_index[0], current_song)
-            is_shuffled[0] = True
-            shuffle_btn.itemconfig(shuffle_circle, fill=colors['primary'])
+        # The view is never reordered, so un-shuffling just continues from the current song
+        engine.set_shuffle(not engine.queue.shuffled)
+        shuffle_btn.itemconfig(shuffle_circle, fill=colors['primary'] if engine.queue.shuffled else colors['secondary'])
+        update_analysis_focus()
 
     def toggle_repeat():
-        repeat_mode[0] = (repeat_mode[0] + 1) % 3
+        engine.set_repeat(engine.repeat + 1)  # 0: no repeat, 1: repeat all, 2: repeat one
         repeat_texts = ["🔁", "🔂", "🔁"]
         repeat_colors = [colors['secondary'], colors['primary'], colors['accent']]
-        repeat_btn.itemconfig(repeat_circle, fill=repeat_colors[repeat_mode[0]])
-        repeat_btn.itemconfig(repeat_text, text=repeat_texts[repeat_mode[0]])
+        repeat_btn.itemconfig(repeat_circle, fill=repeat_colors[engine.repeat])
+        repeat_btn.itemconfig(repeat_text, text=repeat_texts[engine.repeat])
 
     def toggle_play_pause():
-        if mixer.music.get_busy() and not is_paused[0]:
-            mixer.music.pause()
-            is_paused[0] = True
-            play_pause_btn_canvas.itemconfig(play_pause_text, text="▶️")
-        else:
-            mixer.music.unpause()
-            is_paused[0] = False
-            play_pause_btn_canvas.itemconfig(play_pause_text, text="⏸️")
-            # Restart progress thread if needed
-            if is_playing[0] and (not update_thread[0] or not update_thread[0].is_alive()):
-                update_thread[0] = threading.Thread(target=update_progress_bar, daemon=True)
-                update_thread[0].start()
+        playback(engine.toggle)
 
     def stop_song():
-        is_playing[0] = False
-        is_paused[0] = False
-        mixer.music.stop()
+        engine.stop()
         song_title_label.config(text="Stopped")
         artist_label.config(text="")
-        play_pause_btn_canvas.itemconfig(play_pause_text, text="▶️")
-        progress_var.set(0)
-        time_current_label.config(text="00:00")
+        update_play_button()
+        post_position(0)
         show_album_art(None)
 
+    def show_mood(mood):
+        """Point the engine's view at the songs of mood (all songs if it has none); False if it had none"""
+        try:
+            engine.set_filter(mood)
+            return True
+        except DaemonError:
+            if original_songs:  # an empty library has nothing to fall back to
+                engine.set_filter("all")
+            return False
+
+    def dj_order(songs, start=None):
+        """Reorder songs so consecutive tracks have compatible BPM and key"""
+        return sequence_tracks(
+            [(song, (analysis.get(song) or {}).get("bpm"), (analysis.get(song) or {}).get("key"))
+             for song in songs],
+            start=start)
+
     def filter_by_mood(*args):
         nonlocal filtered_songs
         mood = mood_var.get().lower()
-        if mood == "all":
-            filtered_songs = original_songs.copy()
-        else:
-            filtered_songs = [s for s in original_songs if mood_tags[s].lower() == mood]
-            if not filtered_songs:
-                messagebox.showinfo("No Songs", f"No songs found for mood: {mood}. Showing all songs.")
-                filtered_songs = original_songs.copy()
+        if not show_mood(mood):
+            messagebox.showinfo("No Songs", f"No songs found for mood: {mood}. Showing all songs.")
+        filtered_songs = engine.view
+        if auto_dj[0]:
+            filtered_songs = dj_order(filtered_songs)
         
-        # Reset shuffle state when changing mood
-        is_shuffled[0] = False
+        # A new view starts unshuffled from its first song; queued songs stay queued
+        engine.set_view(filtered_songs)
         shuffle_btn.itemconfig(shuffle_circle, fill=colors['secondary'])
         
-        current_index[0] = 0
+        filtered_set[0] = None
+        refresh_track_list()
+        update_analysis_focus(mood_changed=True)
         if filtered_songs:
-            load_song(current_index[0])
+            next_song()
+
+    def reapply_mood_filter():
+        """Rebuild the mood view after tags changed, carrying on from the current song"""
+        nonlocal filtered_songs
+        mood = mood_var.get().lower()
+        if mood == "all":
+            return
+        current = engine.current
+        shuffled = engine.queue.shuffled
+        show_mood(mood)
+        filtered_songs = engine.view
+        if auto_dj[0]:
+            filtered_songs = dj_order(filtered_songs, start=current)
+            engine.set_view(filtered_songs, current=current)
+        filtered_set[0] = None
+        engine.set_shuffle(shuffled)
+        refresh_track_list()
+        update_analysis_focus(mood_changed=True)
+
+    def toggle_auto_dj():
+        """Switch between tempo/key-sequenced and library order, keeping the current song"""
+        nonlocal filtered_songs
+        current = engine.current
+        if not filtered_songs or current is None:
+            return
+        auto_dj[0] = not auto_dj[0]
+        shuffled = engine.queue.shuffled and not auto_dj[0]
+        if auto_dj[0]:
+            filtered_songs = dj_order(filtered_songs, start=current)
+            engine.set_view(filtered_songs, current=current)
+            shuffle_btn.itemconfig(shuffle_circle, fill=colors['secondary'])
+        else:
+            show_mood(mood_var.get().lower())
+            filtered_songs = engine.view
+        filtered_set[0] = None
+        engine.set_shuffle(shuffled)
+        auto_dj_btn.config(text="🎧 AUTO-DJ: ON" if auto_dj[0] else "🎧 AUTO-DJ: OFF")
+        refresh_track_list()
 
     def set_volume(val):
-        volume = float(val) / 100
-        mixer.music.set_volume(volume)
+        engine.set_volume(float(val) / 100)
         volume_label.config(text=f"{int(float(val))}%")
 
     def on_progress_click(event):
@@ -393,13 +490,244 @@ def launch_player(folder_path, mood_tags):
             # Calculate position based on click
             click_pos = event.x / progress_bar.winfo_width()
             new_position = click_pos * song_length[0]
-            current_position[0] = new_position
-            progress_var.set(click_pos * 100)
-            time_current_label.config(text=format_time(new_position))
-            # Note: Actual seeking would require different audio library
+            engine.seek(new_position)
+            post_position(new_position)
         except:
             pass
 
+    def refresh_moods():
+        """Update the mood dropdown after tags changed"""
+        mood_dropdown.configure(values=["All"] + sorted(set(mood.lower() for mood in mood_tags.values())))
+
+    def set_song_mood(song, mood):
+        """Change a song's tag and everything derived from it"""
+        mood_tags[song] = mood
+        update_indexes(song, similarity=False)
+
+    def retag_song():
+        """Let the user correct the current song's mood and learn from it"""
+        song = engine.current
+        if song is None:
+            return
+        known = ", ".join(sorted(set(m.lower() for m in mood_tags.values())))
+        mood = simpledialog.askstring(
+            "Retag", f"Mood for {display_title(song)}\n(known moods: {known})",
+            initialvalue=mood_tags.get(song, ""), parent=window)
+        if not mood or not mood.strip() or mood.strip().lower() == mood_tags.get(song, "").lower():
+            return
+        mood = mood.strip().lower()
+        corrections[song] = mood
+        set_song_mood(song, mood)
+        updated = [song]
+
+        # Update the model and reclassify the songs that sound most like this one
+        if song in analysis and similarity_index[0] is not None and song in similarity_index[0]:
+            window.config(cursor="watch")
+            window.update_idletasks()
+            try:
+                from utils.online_learning import CORRECTOR_FILENAME, MoodCorrector, load_corrector_model
+                corrector_file = os.path.join(folder_path, CORRECTOR_FILENAME)
+                if mood_corrector[0] is None or song not in mood_corrector[0]:
+                    songs_with_features = [s for s in original_songs if (analysis.get(s) or {}).get("features")]
+                    mood_corrector[0] = MoodCorrector(
+                        songs_with_features,
+                        [analysis[s]["features"] for s in songs_with_features],
+                        [mood_tags[s] for s in songs_with_features],
+                        corrections,
+                        model=load_corrector_model(corrector_file))
+                mood_corrector[0].learn(song, mood)
+                neighbours = [s for s, _ in similarity_index[0].most_similar(song, k=RETAG_NEIGHBOURS)
+                              if s not in corrections and s in mood_corrector[0]]
+                for neighbour, predicted in zip(neighbours, mood_corrector[0].predict(neighbours)):
+                    if predicted != mood_tags.get(neighbour):
+                        set_song_mood(neighbour, predicted)
+                        updated.append(neighbour)
+                # Files the watcher tags from now on (and later sessions) use the corrected model
+                mood_corrector[0].save(corrector_file)
+                mood_classifier[0] = None
+            except Exception as e:
+                print(f"[ERROR] Failed to update mood model: {e}")
+            finally:
+                window.config(cursor="")
+
+        try:
+            save_tags(corrections_file, corrections)
+            save_tags(os.path.join(folder_path, MOOD_TAGS_FILENAME), mood_tags)
+        except Exception as e:
+            print(f"[ERROR] Failed to save retag: {e}")
+        artist_label.config(text=f"Mood: {mood_tags[song]}")
+        refresh_moods()
+        reapply_mood_filter()
+        track_list.invalidate(updated)
+        print(f"[RETAGGED] {song} as {mood}; {len(updated) - 1} similar tracks reclassified")
+
+    # Library watching: the watcher thread hands changed files to a low-priority
+    # analysis scheduler, whose results reach the Tk thread through the UI bus
+    library_save_pending = [False]
+    mood_classifier = [None]
+    known_recordings = [None]  # fingerprint -> song, only touched by the analysis worker
+    known_contents = [None]  # content id -> song, likewise
+    departed = {}  # song -> (mood, analysis entry) for files removed while running
+
+    def find_same_file(filename, file_id):
+        """A song with byte-identical audio (renamed, moved or retagged), or None"""
+        if known_contents[0] is None:
+            known_contents[0] = content_index(dict(analysis))
+        # Retagged in place: the file's own entry still describes its audio
+        if (analysis.get(filename) or {}).get("content_id") == file_id:
+            return filename
+        return known_contents[0].get(file_id)
+
+    def find_copy(filename, fingerprint):
+        """An analysed song that is another copy of the same recording, or None"""
+        if known_recordings[0] is None:
+            index = FingerprintIndex()
+            for song, entry in list(analysis.items()):
+                if entry.get("fingerprint"):
+                    index.add(entry["fingerprint"], song)
+            known_recordings[0] = index
+        original = known_recordings[0].find(fingerprint) if fingerprint else None
+        # A modified file must not match its own old content
+        return original if original != filename else None
+
+    def stored_result(song):
+        """(result, fingerprint) already known for song, including songs removed this session"""
+        entry = analysis.get(song)
+        if song in mood_tags and entry:
+            mood = mood_tags[song]
+        elif song in departed:
+            mood, entry = departed[song]
+        else:
+            return None
+        return (mood, entry["bpm"], entry["key"], entry["features"]), entry.get("fingerprint")
+
+    def analyze_changed_file(filename):
+        """Tag one file queued by the watcher (runs on the scheduler's worker thread)"""
+        full_path = os.path.join(folder_path, filename)
+        file_id = content_id(full_path)
+        # Same bytes (a rename or move) costs no decode; same recording costs a short one
+        source = find_same_file(filename, file_id)
+        stored = stored_result(source) if source else None
+        if stored is not None:
+            result, fingerprint = stored
+            if source == filename:
+                print(f"[TAGGED] {filename} audio unchanged, refreshing its metadata only")
+            else:
+                print(f"[TAGGED] {filename} has the same audio as {source}")
+        else:
+            fingerprint = audio_fingerprint(full_path)
+            source = find_copy(filename, fingerprint)
+            stored = stored_result(source) if source else None
+            if stored is not None:
+                result = stored[0]
+                print(f"[TAGGED] {filename} is a copy of {source}")
+            else:
+                source = None
+                classifier = mood_classifier[0]  # reset by retag_song when the corrected model changes
+                if classifier is None:
+                    from utils.mood_detector import get_mood_classifier
+                    classifier = mood_classifier[0] = get_mood_classifier(folder_path=folder_path)
+                from utils.mood_detector import analyze_file
+                result = analyze_file(full_path, *classifier)
+                if result is None:
+                    return None
+        known_contents[0][file_id] = filename
+        if fingerprint and known_recordings[0] is not None:
+            known_recordings[0].add(fingerprint, filename)
+        extras = {"fingerprint": fingerprint, "content_id": file_id, "source": source}
+        return result, read_metadata(full_path), extras
+
+    def post_library_update(filename, update):
+        """Apply an analysis result (or None for a removal) on the Tk thread; the latest per file wins"""
+        ui_bus.post(("track", filename), apply_library_update, filename, update)
+
+    analysis_scheduler = AnalysisScheduler(analyze_changed_file, post_library_update)
+
+    def on_library_change(root, added, removed, modified):
+        """Called from a watcher thread with the changed file names in root"""
+        # Songs in folder_path itself are keyed by file name, those under other roots by full path
+        key = (lambda name: name) if root == folder_path else (lambda name: os.path.join(root, name))
+        for filename in removed:
+            post_library_update(key(filename), None)
+        for filename in added:
+            analysis_scheduler.submit(key(filename), new=True)
+        for filename in modified:
+            analysis_scheduler.submit(key(filename))
+
+    def update_analysis_focus(mood_changed=False):
+        """Rank pending analysis: the next few songs first (shuffled too), then the current mood"""
+        analysis_scheduler.set_focus(upcoming=engine.upcoming(UPCOMING_ANALYSIS),
+                                     mood=filtered_songs if mood_changed else None)
+
+    def add_or_update_song(filename, result, info, extras=None):
+        """Merge a freshly analyzed file into the library"""
+        mood, bpm, key, features = result
+        extras = extras or {}
+        source = extras.get("source")
+        if source in corrections and filename not in corrections:
+            # A renamed or copied file keeps the user's manual retag
+            corrections[filename] = corrections[source]
+            try:
+                save_tags(corrections_file, corrections)
+            except Exception as e:
+                print(f"[ERROR] Failed to save corrections: {e}")
+        mood = corrections.get(filename, mood)
+        is_new = filename not in mood_tags
+        mood_tags[filename] = mood
+        features = [float(x) for x in features]
+        analysis[filename] = {"bpm": bpm, "key": key, "features": features,
+                              "fingerprint": extras.get("fingerprint"), "content_id": extras.get("content_id")}
+        metadata[filename] = info
+        artwork.forget(os.path.join(folder_path, filename))  # the cover may have changed too
+        if is_new:
+            selected = mood_var.get().lower()
+            in_view = selected == "all" or selected == mood.lower()
+            engine.add_song(filename, in_view=in_view)  # appends to filtered_songs if in_view
+            if in_view:
+                filtered_set[0] = None
+        update_indexes(filename)
+        track_list.invalidate([filename])
+        print(f"[TAGGED] {filename} as {mood} (BPM={bpm:.2f}, Key={key})")
+
+    def remove_song(filename):
+        """Drop a file that disappeared from the folder"""
+        if filename not in mood_tags:
+            return
+        if filename in analysis:
+            departed[filename] = (mood_tags[filename], analysis[filename])
+        del mood_tags[filename]
+        analysis.pop(filename, None)
+        metadata.pop(filename, None)
+        engine.remove_song(filename)  # from original_songs and filtered_songs
+        filtered_set[0] = None
+        update_indexes(filename)
+        print(f"[REMOVED] {filename}")
+
+    def apply_library_update(filename, update):
+        """Merge one watcher result into the library (Tk thread)"""
+        if update is None:
+            remove_song(filename)
+        else:
+            add_or_update_song(filename, *update)
+        # However many files changed this frame, the views refresh once and the JSON is saved once a second
+        ui_bus.post("library_view", refresh_library_view)
+        if not library_save_pending[0]:
+            library_save_pending[0] = True
+            window.after(1000, save_library)
+
+    def refresh_library_view():
+        refresh_moods()
+        refresh_track_list()
+
+    def save_library():
+        library_save_pending[0] = False
+        try:
+            save_tags(os.path.join(folder_path, MOOD_TAGS_FILENAME), mood_tags)
+            save_tags(os.path.join(folder_path, ANALYSIS_FILENAME), analysis)
+            save_tags(os.path.join(folder_path, METADATA_FILENAME), metadata)
+        except Exception as e:
+            print(f"[ERROR] Failed to save library changes: {e}")
+
     # Main container with padding and blur effect
     # Scrollable Canvas Wrapper
     canvas = tk.Canvas(window, bg=colors['bg'], highlightthickness=0)
@@ -448,6 +776,7 @@ def launch_player(folder_path, mood_tags):
 
     album_art_label = tk.Label(art_frame, bg=colors['card_bg'])
     album_art_label.pack(padx=20, pady=20)
+    artwork = ArtworkLoader(ui_bus, extract_album_art, os.path.join("assets", "default_cover.jpg"))
 
     # Song info card with better layout
     info_frame = create_glass_frame(top_section)
@@ -505,6 +834,28 @@ def launch_player(folder_path, mood_tags):
     )
     mood_dropdown.pack(anchor="w", pady=5)
 
+    tk.Label(mood_frame, text="SEARCH", bg=colors['card_bg'], fg=colors['text'],
+             font=("Segoe UI", 12, "bold")).pack(anchor="w", pady=(15, 8))
+
+    search_var = tk.StringVar(window)
+    search_entry = tk.Entry(
+        mood_frame,
+        textvariable=search_var,
+        font=("Segoe UI", 11),
+        width=32,
+        bg=colors['bg'],
+        fg=colors['text'],
+        insertbackground=colors['text'],
+        relief="flat",
+        highlightthickness=1,
+        highlightbackground=colors['secondary'],
+        highlightcolor=colors['primary']
+    )
+    search_entry.pack(anchor="w", pady=5)
+    search_entry.bind("<Escape>", lambda e: search_var.set(""))
+    search_var.trace("w", on_search)
+    threading.Thread(target=build_indexes, args=(list(original_songs),), daemon=True).start()
+
     # Progress section with enhanced styling
     progress_section = create_glass_frame(main_container)
     progress_section.pack(fill="x", pady=(0, 20), padx=5)
@@ -635,15 +986,88 @@ def launch_player(folder_path, mood_tags):
                             fg=colors['text'], font=("Segoe UI", 12, "bold"))
     volume_label.pack(side="left", padx=10)
 
+    # Library actions row (similar / auto-DJ / retag)
+    actions_frame = tk.Frame(bottom_controls, bg=colors['card_bg'])
+    actions_frame.pack(pady=(0, 15))
+
+    # PLAY SIMILAR button
+    similar_btn = create_rounded_button(actions_frame, "✨ SIMILAR", play_similar, width=10, height=2,
+                                       bg_color=colors['secondary'], font_size=11)
+    similar_btn.pack(side="left", padx=10)
+
+    # AUTO-DJ toggle
+    auto_dj_btn = create_rounded_button(actions_frame, "🎧 AUTO-DJ: OFF", toggle_auto_dj, width=14, height=2,
+                                       bg_color=colors['secondary'], font_size=11)
+    auto_dj_btn.pack(side="left", padx=10)
+
+    # Up-next queue for the track selected in the list
+    play_next_btn = create_rounded_button(actions_frame, "⤴️ PLAY NEXT", lambda: queue_selected(play_next=True),
+                                          width=11, height=2, bg_color=colors['secondary'], font_size=11)
+    play_next_btn.pack(side="left", padx=10)
+
+    queue_btn = create_rounded_button(actions_frame, "➕ QUEUE", queue_selected, width=10, height=2,
+                                      bg_color=colors['secondary'], font_size=11)
+    queue_btn.pack(side="left", padx=10)
+
+    # RETAG button
+    retag_btn = create_rounded_button(actions_frame, "🏷️ RETAG", retag_song, width=10, height=2,
+                                     bg_color=colors['secondary'], font_size=11)
+    retag_btn.pack(side="left", padx=10)
+
+    # Track list section
+    library_section = create_glass_frame(main_container)
+    library_section.pack(fill="both", expand=True, padx=5, pady=(0, 30))
+
+    tk.Label(library_section, text="TRACKS", bg=colors['card_bg'], fg=colors['text'],
+             font=("Segoe UI", 12, "bold")).pack(anchor="w", padx=25, pady=(15, 5))
+
+    track_list = VirtualTrackList(
+        library_section,
+        columns=[
+            ("title", "Title", 360, "w"),
+            ("mood", "Mood", 120, "w"),
+            ("bpm", "BPM", 70, "e"),
+            ("duration", "Time", 70, "e"),
+        ],
+        get_values=track_values,
+        sort_key=track_sort_key,
+        on_activate=play_from_list,
+        height=12,
+        colors=colors
+    )
+    track_list.pack(fill="both", expand=True, padx=25, pady=(0, 20))
+    refresh_track_list()
+
     # Initialize with first song
     show_album_art(None)
+    threading.Thread(target=update_progress_bar, daemon=True).start()
     if filtered_songs:
-        window.after(100, lambda: load_song(current_index[0]))
+        window.after(100, next_song)
 
     # Handle window closing
+    # Pick up files added to or removed from the folders while the player runs
+    watchers = []
+    update_analysis_focus(mood_changed=True)
+    for root in roots or [folder_path]:
+        watcher = LibraryWatcher(root, lambda *changes, root=root: on_library_change(root, *changes))
+        try:
+            watcher.start()
+            watchers.append(watcher)
+        except OSError as e:
+            print(f"[ERROR] Could not watch {root}: {e}")
+
     def on_closing():
-        is_playing[0] = False
-        mixer.quit()
+        progress_stop.set()
+        for watcher in watchers:
+            watcher.stop()
+        analysis_scheduler.stop()
+        ui_bus.stop()
+        # Results still waiting for the next frame or the delayed save would be lost with the window
+        ui_bus.flush()
+        if library_save_pending[0]:
+            save_library()
+        artwork.close()
+        engine.close()
         window.destroy()
 
     window.protocol("WM_DELETE_WINDOW", on_closing)
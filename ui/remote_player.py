@@ -0,0 +1,193 @@
+import os
+import tkinter as tk
+from tkinter import messagebox, ttk
+
+from utils.daemon_client import DaemonError
+from ui.track_list import VirtualTrackList
+
+# How often the window asks the daemon for its status, in milliseconds
+STATUS_INTERVAL_MS = 500
+
+
+def format_time(seconds):
+    """Format seconds to MM:SS"""
+    return f"{int(seconds // 60):02d}:{int(seconds % 60):02d}"
+
+
+def launch_remote(client):
+    """
+    A window that controls a running player daemon through client (a
+    DaemonClient). It holds no library or mixer state of its own, so it
+    opens instantly and closing it leaves playback running.
+    """
+    colors = {
+        'bg': '#121212',
+        'card_bg': '#1e1e1e',
+        'primary': '#1ed760',
+        'secondary': '#3e3e3e',
+        'text': '#ffffff',
+        'text_secondary': '#aaaaaa',
+    }
+    window = tk.Tk()
+    window.title("Smart Music Player")
+    window.geometry("700x600")
+    window.configure(bg=colors['bg'])
+
+    titles = {}  # song -> (title, mood) for the rows fetched from the daemon
+    seeking = [False]
+    connected = [True]
+    duration = [0.0]
+
+    def call(cmd, **args):
+        """Send a command; errors are shown instead of raised"""
+        try:
+            return client.call(cmd, **args)
+        except DaemonError as e:
+            messagebox.showwarning("Player", str(e))
+        except (OSError, ValueError) as e:
+            if connected[0]:
+                connected[0] = False
+                messagebox.showerror("Player", f"Lost connection to the player daemon: {e}")
+                window.destroy()
+        return None
+
+    def load_songs():
+        """Fetch the daemon's current (filtered) view page by page"""
+        songs = []
+        while True:
+            page = call("songs", offset=len(songs))
+            if page is None:
+                return
+            for song, title, mood in page["songs"]:
+                titles[song] = (title, mood)
+                songs.append(song)
+            if not page["songs"] or len(songs) >= page["total"]:
+                break
+        track_list.set_rows(songs)
+
+    def show_status(status):
+        if status is None:
+            return
+        if status["song"]:
+            title_label.config(text=status["title"])
+            mood_label.config(text=f"Mood: {status['mood']}")
+            track_list.set_current(status["song"])
+        else:
+            title_label.config(text="No song loaded")
+            mood_label.config(text="")
+        duration[0] = status["duration"] or 0
+        if not seeking[0]:
+            progress_var.set(100 * status["position"] / duration[0] if duration[0] else 0)
+        time_label.config(text=f"{format_time(status['position'])} / "
+                               f"{format_time(duration[0]) if duration[0] else '--:--'}")
+        play_btn.config(text="⏸️" if status["state"] == "playing" else "▶️")
+        shuffle_btn.config(bg=colors['primary'] if status["shuffle"] else colors['secondary'])
+        repeat_btn.config(text=["🔁 OFF", "🔁 ALL", "🔂 ONE"][status["repeat"]])
+        queue_label.config(text=f"Up next: {len(status['up_next'])}" if status["up_next"] else "")
+
+    def poll():
+        if not connected[0]:
+            return
+        show_status(call("status"))
+        window.after(STATUS_INTERVAL_MS, poll)
+
+    def command(cmd, **args):
+        show_status(call(cmd, **args))
+
+    def on_filter(*args):
+        if call("filter", mood=mood_var.get().lower()) is not None:
+            load_songs()
+
+    def on_seek(event):
+        seeking[0] = False
+        if duration[0]:
+            command("seek", seconds=progress_var.get() / 100 * duration[0])
+
+    def toggle_shuffle():
+        status = call("status")
+        if status is not None:
+            command("shuffle", on=not status["shuffle"])
+
+    def toggle_repeat():
+        status = call("status")
+        if status is not None:
+            command("repeat", mode=(status["repeat"] + 1) % 3)
+
+    def queue_selected(play_next=False):
+        if track_list.selected is not None:
+            command("queue", song=track_list.selected, next=play_next)
+
+    info_frame = tk.Frame(window, bg=colors['card_bg'])
+    info_frame.pack(fill="x", padx=20, pady=(20, 10))
+    title_label = tk.Label(info_frame, text="No song loaded", font=("Segoe UI", 18, "bold"),
+                           bg=colors['card_bg'], fg=colors['text'], anchor="w")
+    title_label.pack(fill="x", padx=20, pady=(15, 5))
+    mood_label = tk.Label(info_frame, text="", font=("Segoe UI", 12),
+                          bg=colors['card_bg'], fg=colors['text_secondary'], anchor="w")
+    mood_label.pack(fill="x", padx=20, pady=(0, 15))
+
+    progress_var = tk.DoubleVar()
+    progress_bar = tk.Scale(info_frame, from_=0, to=100, orient="horizontal", variable=progress_var,
+                            showvalue=False, bg=colors['card_bg'], troughcolor=colors['bg'],
+                            highlightthickness=0, bd=0, sliderrelief="flat")
+    progress_bar.pack(fill="x", padx=20)
+    progress_bar.bind("<ButtonPress-1>", lambda e: seeking.__setitem__(0, True))
+    progress_bar.bind("<ButtonRelease-1>", on_seek)
+    time_label = tk.Label(info_frame, text="00:00 / --:--", bg=colors['card_bg'], fg=colors['text'],
+                          font=("Segoe UI", 10))
+    time_label.pack(anchor="e", padx=20, pady=(0, 10))
+
+    controls = tk.Frame(window, bg=colors['bg'])
+    controls.pack(pady=5)
+
+    def button(text, action):
+        btn = tk.Button(controls, text=text, command=action, font=("Segoe UI", 11, "bold"),
+                        bg=colors['secondary'], fg=colors['text'], relief="flat", bd=0,
+                        cursor="hand2", padx=10, pady=5)
+        btn.pack(side="left", padx=5)
+        return btn
+
+    shuffle_btn = button("🔀", toggle_shuffle)
+    button("⏮️", lambda: command("prev"))
+    play_btn = button("▶️", lambda: command("toggle"))
+    button("⏭️", lambda: command("next"))
+    button("⏹️", lambda: command("stop"))
+    repeat_btn = button("🔁 OFF", toggle_repeat)
+
+    list_frame = tk.Frame(window, bg=colors['card_bg'])
+    list_frame.pack(fill="both", expand=True, padx=20, pady=(10, 20))
+    filter_row = tk.Frame(list_frame, bg=colors['card_bg'])
+    filter_row.pack(fill="x", padx=15, pady=10)
+    moods = call("moods")
+    status = call("status")
+    mood_var = tk.StringVar(window, value=status["filter"] if status and status["filter"] != "all" else "All")
+    ttk.Combobox(filter_row, textvariable=mood_var, state="readonly", width=20,
+                 values=["All"] + (moods["moods"] if moods else [])).pack(side="left")
+    mood_var.trace("w", on_filter)
+    tk.Button(filter_row, text="➕ QUEUE", command=queue_selected, bg=colors['secondary'],
+              fg=colors['text'], relief="flat").pack(side="right", padx=5)
+    tk.Button(filter_row, text="⤴️ PLAY NEXT", command=lambda: queue_selected(play_next=True),
+              bg=colors['secondary'], fg=colors['text'], relief="flat").pack(side="right", padx=5)
+    queue_label = tk.Label(filter_row, text="", bg=colors['card_bg'], fg=colors['text_secondary'])
+    queue_label.pack(side="right", padx=10)
+
+    track_list = VirtualTrackList(
+        list_frame,
+        columns=[("title", "Title", 420, "w"), ("mood", "Mood", 120, "w")],
+        get_values=lambda song: titles.get(song, (os.path.basename(song), "")),
+        on_activate=lambda song: command("play", song=song),
+        height=12,
+        colors=colors
+    )
+    track_list.pack(fill="both", expand=True, padx=15, pady=(0, 15))
+
+    load_songs()
+    poll()
+
+    def on_closing():
+        connected[0] = False
+        client.close()
+        window.destroy()
+
+    window.protocol("WM_DELETE_WINDOW", on_closing)
+    window.mainloop()
@@ -0,0 +1,220 @@
+import tkinter as tk
+from tkinter import ttk
+
+
+class VirtualTrackList(tk.Frame):
+    """
+    A track list that only ever creates `height` Treeview rows and re-fills
+    them with whichever slice of the song list is in view, so it stays fast
+    for libraries with hundreds of thousands of entries.
+    """
+
+    def __init__(self, parent, columns, get_values, sort_key=None, on_activate=None,
+                 height=12, colors=None, **kwargs):
+        """
+        columns: list of (column_id, heading, width, anchor) tuples
+        get_values: song -> tuple of display values, one per column
+        sort_key: (song, column_id) -> sortable value; defaults to the display value
+        on_activate: called with the song when a row is double-clicked or Enter is pressed
+        """
+        colors = colors or {}
+        super().__init__(parent, bg=colors.get('card_bg'), **kwargs)
+        self._columns = [c[0] for c in columns]
+        self._headings = {c[0]: c[1] for c in columns}
+        self._get_values = get_values
+        self._sort_key = sort_key or (lambda song, col: get_values(song)[self._columns.index(col)])
+        self._on_activate = on_activate
+        self._height = height
+
+        self._rows = []          # songs in display order
+        self._positions = None   # song -> index in _rows, built on demand
+        self._key_cache = {}     # column -> {song: sort key}
+        self._sort_column = None
+        self._sort_reverse = False
+        self._offset = 0
+        self._selected = None
+        self._current = None
+
+        style = ttk.Style(self)
+        style.configure('Tracks.Treeview',
+                        background=colors.get('card_bg', '#1e1e1e'),
+                        fieldbackground=colors.get('card_bg', '#1e1e1e'),
+                        foreground=colors.get('text', '#ffffff'),
+                        rowheight=24, borderwidth=0)
+        style.configure('Tracks.Treeview.Heading',
+                        background=colors.get('secondary', '#3e3e3e'),
+                        foreground=colors.get('text', '#ffffff'),
+                        relief="flat")
+        style.map('Tracks.Treeview',
+                  background=[('selected', colors.get('secondary', '#3e3e3e'))])
+
+        self.tree = ttk.Treeview(self, columns=self._columns, show="headings",
+                                 height=height, selectmode="browse", style='Tracks.Treeview')
+        for column_id, heading, width, anchor in columns:
+            self.tree.heading(column_id, text=heading,
+                              command=lambda c=column_id: self.sort_by(c))
+            self.tree.column(column_id, width=width, anchor=anchor, stretch=column_id == self._columns[0])
+        self.tree.tag_configure("current", foreground=colors.get('primary', '#1ed760'))
+
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self._yview)
+        self.scrollbar.pack(side="right", fill="y")
+        self.tree.pack(side="left", fill="both", expand=True)
+
+        # Fixed pool of row items; only their values change while scrolling
+        self._items = [self.tree.insert("", "end", values=()) for _ in range(height)]
+
+        self.tree.bind("<Double-1>", self._on_double_click)
+        self.tree.bind("<Return>", lambda e: self._activate(self._selected))
+        self.tree.bind("<Up>", lambda e: self._move_selection(-1))
+        self.tree.bind("<Down>", lambda e: self._move_selection(1))
+        self.tree.bind("<Prior>", lambda e: self._move_selection(-self._height))
+        self.tree.bind("<Next>", lambda e: self._move_selection(self._height))
+        self.tree.bind("<Home>", lambda e: self._move_selection(-len(self._rows)))
+        self.tree.bind("<End>", lambda e: self._move_selection(len(self._rows)))
+        self.tree.bind("<MouseWheel>", lambda e: self._scroll_rows(-3 if e.delta > 0 else 3))
+        self.tree.bind("<Button-4>", lambda e: self._scroll_rows(-3))
+        self.tree.bind("<Button-5>", lambda e: self._scroll_rows(3))
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+
+    # Data
+
+    def set_rows(self, songs):
+        """Replace the listed songs, keeping the active sort order."""
+        self._rows = list(songs)
+        if self._sort_column is not None:
+            self._apply_sort()
+        self._positions = None
+        self._offset = min(self._offset, max(len(self._rows) - self._height, 0))
+        self._render()
+
+    def invalidate(self, songs=None):
+        """Drop cached sort keys (for the given songs, or all) after their data changed."""
+        if songs is None:
+            self._key_cache.clear()
+        else:
+            for cache in self._key_cache.values():
+                for song in songs:
+                    cache.pop(song, None)
+        self._render()
+
+    def sort_by(self, column):
+        """Sort by a column; clicking the same column again reverses the order."""
+        if self._sort_column == column:
+            self._sort_reverse = not self._sort_reverse
+        else:
+            self._sort_column = column
+            self._sort_reverse = False
+        for column_id in self._columns:
+            arrow = ""
+            if column_id == column:
+                arrow = " ▼" if self._sort_reverse else " ▲"
+            self.tree.heading(column_id, text=self._headings[column_id] + arrow)
+        self._apply_sort()
+        self._positions = None
+        self.see(self._selected or self._current)
+        self._render()
+
+    def _apply_sort(self):
+        cache = self._key_cache.setdefault(self._sort_column, {})
+        column = self._sort_column
+        for song in self._rows:
+            if song not in cache:
+                cache[song] = self._sort_key(song, column)
+        self._rows.sort(key=cache.__getitem__, reverse=self._sort_reverse)
+
+    def index_of(self, song):
+        if self._positions is None:
+            self._positions = {s: i for i, s in enumerate(self._rows)}
+        return self._positions.get(song)
+
+    # Navigation
+
+    @property
+    def selected(self):
+        """The highlighted song, or None."""
+        return self._selected
+
+    def set_current(self, song):
+        """Highlight the playing song and scroll it into view."""
+        self._current = song
+        self.see(song)
+        self._render()
+
+    def see(self, song):
+        """Scroll so that song is visible."""
+        index = self.index_of(song) if song is not None else None
+        if index is None:
+            return
+        if index < self._offset or index >= self._offset + self._height:
+            self._offset = max(0, min(index - self._height // 2, len(self._rows) - self._height))
+            self._render()
+
+    def _scroll_rows(self, delta):
+        limit = max(len(self._rows) - self._height, 0)
+        self._offset = max(0, min(self._offset + delta, limit))
+        self._render()
+        return "break"
+
+    def _yview(self, *args):
+        if args[0] == "moveto":
+            self._offset = int(float(args[1]) * len(self._rows))
+            self._scroll_rows(0)
+        elif args[0] == "scroll":
+            step = int(args[1]) * (self._height if args[2] == "pages" else 1)
+            self._scroll_rows(step)
+
+    def _move_selection(self, delta):
+        if not self._rows:
+            return "break"
+        index = self.index_of(self._selected)
+        index = 0 if index is None else max(0, min(index + delta, len(self._rows) - 1))
+        self._selected = self._rows[index]
+        self.see(self._selected)
+        self._render()
+        return "break"
+
+    def _on_select(self, event):
+        selection = self.tree.selection()
+        if selection and selection[0] in self._items:
+            index = self._offset + self._items.index(selection[0])
+            if index < len(self._rows):
+                self._selected = self._rows[index]
+
+    def _on_double_click(self, event):
+        item = self.tree.identify_row(event.y)
+        if item in self._items:
+            index = self._offset + self._items.index(item)
+            if index < len(self._rows):
+                self._activate(self._rows[index])
+
+    def _activate(self, song):
+        if song is not None and self._on_activate:
+            self._on_activate(song)
+        return "break"
+
+    # Drawing
+
+    def _render(self):
+        """Fill the pooled rows with the visible slice and sync the scrollbar."""
+        selected_item = None
+        for i, item in enumerate(self._items):
+            index = self._offset + i
+            if index < len(self._rows):
+                song = self._rows[index]
+                self.tree.item(item, values=self._get_values(song),
+                               tags=("current",) if song == self._current else ())
+                if song == self._selected:
+                    selected_item = item
+            else:
+                self.tree.item(item, values=(), tags=())
+        if selected_item:
+            self.tree.selection_set(selected_item)
+            self.tree.focus(selected_item)
+        elif self.tree.selection():
+            self.tree.selection_remove(self.tree.selection())
+
+        total = len(self._rows)
+        if total <= self._height:
+            self.scrollbar.set(0, 1)
+        else:
+            self.scrollbar.set(self._offset / total, (self._offset + self._height) / total)
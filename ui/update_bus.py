@@ -0,0 +1,51 @@
+import threading
+
+# Interval of the pump that applies posted updates, in milliseconds (about 30 per second)
+FRAME_MS = 33
+
+
+class UIUpdateBus:
+    """
+    Lets any thread change the UI without touching Tk. post(key, apply, *args)
+    records that apply(*args) should run on the Tk thread; a single after()
+    pump runs everything posted since the last frame, once per frame. Posts
+    under the same key coalesce, so only the latest survives (the key names
+    the widget or piece of state being updated), and a worker can post as
+    often as it likes without making Tk redraw more than once per frame.
+    """
+
+    def __init__(self, window, frame_ms=FRAME_MS):
+        self._window = window
+        self._frame_ms = frame_ms
+        self._pending = {}  # key -> (apply, args), in first-posted order
+        self._lock = threading.Lock()
+        self._running = False
+
+    def post(self, key, apply, *args):
+        """Schedule apply(*args) for the next frame, replacing anything pending under key."""
+        with self._lock:
+            self._pending[key] = (apply, args)
+
+    def start(self):
+        if not self._running:
+            self._running = True
+            self._window.after(self._frame_ms, self._pump)
+
+    def stop(self):
+        self._running = False
+
+    def flush(self):
+        """Apply everything posted so far, now (Tk thread only), e.g. before the window closes."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for key, (apply, args) in pending.items():
+            try:
+                apply(*args)
+            except Exception as e:
+                print(f"[ERROR] UI update {key} failed: {e}")
+
+    def _pump(self):
+        if not self._running:
+            return
+        self.flush()
+        self._window.after(self._frame_ms, self._pump)
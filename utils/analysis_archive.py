@@ -0,0 +1,204 @@
+# Pack a library's analysis into one .npz of typed columns, to move it between machines
+#
+#   python -m utils.analysis_archive export path/to/music library.npz [--tag]
+#   python -m utils.analysis_archive import library.npz path/to/music
+#
+import argparse
+import os
+
+import numpy as np
+
+from utils.content_id import content_id
+from utils.tag_manager import (ANALYSIS_FILENAME, CORRECTIONS_FILENAME, MOOD_TAGS_FILENAME,
+                               load_tags, save_tags)
+
+ARCHIVE_FORMAT = 1
+KEY_CODES = {"minor": 0, "major": 1}
+KEY_NAMES = {code: key for key, code in KEY_CODES.items()}
+DIGEST_BYTES = 16
+
+
+def _pack_strings(strings):
+    """Strings as one UTF-8 byte array plus end offsets."""
+    encoded = [s.encode("utf-8") for s in strings]
+    ends = np.cumsum([len(b) for b in encoded], dtype=np.int64)
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), ends
+
+
+def _unpack_strings(blob, ends):
+    text = blob.tobytes()
+    starts = np.concatenate(([0], ends[:-1])).tolist()
+    return [text[a:b].decode("utf-8") for a, b in zip(starts, ends.tolist())]
+
+
+def _split_content_id(value):
+    if not value:
+        return -1, bytes(DIGEST_BYTES)
+    length, digest = value.split("-")
+    return int(length), bytes.fromhex(digest)
+
+
+def export_analysis(archive_path, mood_tags, analysis, corrections=None):
+    """
+    Write every tagged track to archive_path as columns: file names, content
+    ids (audio length + digest), mood codes with a mood name table, BPM, key,
+    feature matrix, fingerprints and a mask of manual retags.
+    """
+    corrections = corrections or {}
+    names = sorted(mood_tags)
+    entries = [analysis.get(name) or {} for name in names]
+    mood_names = sorted({mood_tags[name] for name in names})
+    mood_code = {mood: code for code, mood in enumerate(mood_names)}
+
+    lengths, digests = zip(*(_split_content_id(e.get("content_id")) for e in entries)) if names else ((), ())
+    feature_count = max((len(e.get("features") or ()) for e in entries), default=0)
+    features = np.full((len(names), feature_count), np.nan, dtype=np.float32)
+    for row, entry in enumerate(entries):
+        if entry.get("features"):
+            features[row] = entry["features"]
+    fingerprints = [e.get("fingerprint") or "" for e in entries]
+
+    name_blob, name_ends = _pack_strings(names)
+    mood_blob, mood_ends = _pack_strings(mood_names)
+    fingerprint_blob, fingerprint_ends = _pack_strings(fingerprints)
+    tmp_path = archive_path + ".tmp.npz"
+    np.savez(
+        tmp_path,
+        format=np.array(ARCHIVE_FORMAT),
+        name_blob=name_blob, name_ends=name_ends,
+        audio_length=np.array(lengths, dtype=np.int64),
+        digest=np.frombuffer(b"".join(digests), dtype=np.uint8).reshape(len(names), DIGEST_BYTES),
+        mood_blob=mood_blob, mood_ends=mood_ends,
+        mood=np.array([mood_code[mood_tags[name]] for name in names], dtype=np.uint16),
+        corrected=np.array([name in corrections for name in names], dtype=bool),
+        bpm=np.array([e.get("bpm") or np.nan for e in entries], dtype=np.float32),
+        key=np.array([KEY_CODES.get(e.get("key"), -1) for e in entries], dtype=np.int8),
+        features=features,
+        fingerprint_blob=fingerprint_blob, fingerprint_ends=fingerprint_ends,
+    )
+    os.replace(tmp_path, archive_path)
+    return len(names)
+
+
+class AnalysisArchive:
+    """
+    Columns read back from an exported archive. Arrays are loaded eagerly
+    (one read per column, no pickling); per-track dicts are only built by
+    to_library() for the tracks that are matched.
+    """
+
+    def __init__(self, archive_path):
+        with np.load(archive_path, allow_pickle=False) as data:
+            if int(data["format"]) != ARCHIVE_FORMAT:
+                raise ValueError(f"Unsupported analysis archive format {int(data['format'])}")
+            self.names = _unpack_strings(data["name_blob"], data["name_ends"])
+            self.mood_names = _unpack_strings(data["mood_blob"], data["mood_ends"])
+            self.audio_length = data["audio_length"]
+            self.digest = data["digest"]
+            self.mood = data["mood"]
+            self.corrected = data["corrected"]
+            self.bpm = data["bpm"]
+            self.key = data["key"]
+            self.features = data["features"]
+            self._fingerprint_blob = data["fingerprint_blob"]
+            self._fingerprint_ends = data["fingerprint_ends"]
+
+    def __len__(self):
+        return len(self.names)
+
+    def content_ids(self):
+        """content id -> row, for rows exported with one."""
+        hex_digests = self.digest.tobytes().hex()
+        width = 2 * self.digest.shape[1]
+        return {f"{length}-{hex_digests[row * width:(row + 1) * width]}": row
+                for row, length in enumerate(self.audio_length.tolist()) if length >= 0}
+
+    def entry(self, row, fingerprint=None):
+        """(mood, analysis entry) for one row, in the shape analysis.json uses."""
+        key = KEY_NAMES.get(int(self.key[row]))
+        bpm = float(self.bpm[row])
+        features = self.features[row]
+        length = int(self.audio_length[row])
+        return self.mood_names[self.mood[row]], {
+            "bpm": None if np.isnan(bpm) else bpm,
+            "key": key,
+            "features": None if np.isnan(features).any() else features.tolist(),
+            "content_id": f"{length}-{self.digest[row].tobytes().hex()}" if length >= 0 else None,
+            "fingerprint": fingerprint or None,
+        }
+
+    def to_library(self, folder_path, filenames):
+        """
+        Match filenames in folder_path to archive rows, by content id (so a
+        different layout on this machine still matches), or by name for rows
+        exported without one. A file whose audio matches no row is left out,
+        so the player analyses it. Returns (mood_tags, analysis, corrections)
+        for the matches.
+        """
+        by_content = self.content_ids()
+        by_name = {name: row for row, name in enumerate(self.names)}
+        fingerprints = _unpack_strings(self._fingerprint_blob, self._fingerprint_ends)
+        mood_tags, analysis, corrections = {}, {}, {}
+        for filename in filenames:
+            try:
+                row = by_content.get(content_id(os.path.join(folder_path, filename)))
+            except OSError:
+                row = None
+            if row is None:
+                row = by_name.get(filename)
+                # A row with a content id that didn't match describes different audio
+                if row is None or self.audio_length[row] >= 0:
+                    continue
+            mood, entry = self.entry(row, fingerprints[row])
+            mood_tags[filename] = mood
+            analysis[filename] = entry
+            if self.corrected[row]:
+                corrections[filename] = mood
+        return mood_tags, analysis, corrections
+
+
+def _load_or_empty(path):
+    return load_tags(path) if os.path.exists(path) else {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or import a library's analysis as a compact .npz.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="write a folder's analysis to an archive")
+    export.add_argument("folder")
+    export.add_argument("archive")
+    export.add_argument("--tag", action="store_true", help="analyse the folder first if it has no tags yet")
+    restore = commands.add_parser("import", help="tag a folder from an archive")
+    restore.add_argument("archive")
+    restore.add_argument("folder")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        tag_file = os.path.join(args.folder, MOOD_TAGS_FILENAME)
+        if args.tag and not os.path.exists(tag_file):
+            from utils.mood_detector import process_folder
+            analysis = {}
+            save_tags(tag_file, process_folder(args.folder, analysis))
+            save_tags(os.path.join(args.folder, ANALYSIS_FILENAME), analysis)
+        count = export_analysis(args.archive, load_tags(tag_file),
+                                _load_or_empty(os.path.join(args.folder, ANALYSIS_FILENAME)),
+                                _load_or_empty(os.path.join(args.folder, CORRECTIONS_FILENAME)))
+        print(f"[EXPORT] {count} tracks written to {args.archive}")
+    else:
+        archive = AnalysisArchive(args.archive)
+        filenames = sorted(f for f in os.listdir(args.folder) if f.endswith(".mp3"))
+        mood_tags, analysis, corrections = archive.to_library(args.folder, filenames)
+        # Tracks already tagged here keep their local results unless the archive has them too
+        paths = {name: os.path.join(args.folder, name)
+                 for name in (MOOD_TAGS_FILENAME, ANALYSIS_FILENAME, CORRECTIONS_FILENAME)}
+        for name, imported in ((MOOD_TAGS_FILENAME, mood_tags), (ANALYSIS_FILENAME, analysis),
+                               (CORRECTIONS_FILENAME, corrections)):
+            merged = _load_or_empty(paths[name])
+            merged.update(imported)
+            if merged:
+                save_tags(paths[name], merged)
+        print(f"[IMPORT] Tagged {len(mood_tags)} of {len(filenames)} files from {len(archive)} archived tracks")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+# Background analysis that stays out of the way of playback
+import heapq
+import itertools
+import os
+import threading
+import time
+
+# Lower runs first
+PRIORITY_UPCOMING = 0    # about to be played
+PRIORITY_MOOD = 1        # in the mood the user is listening to
+PRIORITY_NEW = 2         # not in the library yet (a file just added)
+PRIORITY_BACKGROUND = 3  # everything else
+
+# Nice value for analysis threads (0 is normal, 19 the lowest priority)
+WORKER_NICENESS = 10
+# How long workers hold off new jobs when the mixer starts a track
+MIXER_START_HOLD = 2.0
+
+
+def _lower_thread_priority(niceness, cpus):
+    """Renice and pin the calling thread (Linux treats both as per-thread)."""
+    tid = threading.get_native_id()
+    if niceness and hasattr(os, "setpriority"):
+        try:
+            os.setpriority(os.PRIO_PROCESS, tid, niceness)
+        except OSError as e:
+            print(f"[ERROR] Could not lower analysis priority: {e}")
+    if cpus and hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(tid, cpus)
+        except OSError as e:
+            print(f"[ERROR] Could not set analysis CPU affinity: {e}")
+
+
+def background_cpus():
+    """Every CPU but the first, which is left to playback and the UI (all of them on one core)."""
+    if not hasattr(os, "sched_getaffinity"):
+        return None
+    cpus = sorted(os.sched_getaffinity(0))
+    return set(cpus[1:]) if len(cpus) > 1 else None
+
+
+class AnalysisScheduler:
+    """
+    Runs work(key) for submitted keys on low-priority worker threads and hands
+    results to on_result(key, result) (on the worker thread). Pending keys are
+    kept in a heap ordered by priority: keys in the upcoming set first, then
+    those in the current-mood set, then keys submitted as new, then the rest,
+    in submission order within a level. The sets come from set_focus() and re-rank whatever is still
+    pending. hold() keeps workers from starting new jobs for a moment, e.g.
+    while the mixer opens a track.
+    """
+
+    def __init__(self, work, on_result, workers=1, niceness=WORKER_NICENESS, cpus=None):
+        self._work = work
+        self._on_result = on_result
+        self._workers = workers
+        self._niceness = niceness
+        self._cpus = cpus if cpus is not None else background_cpus()
+        self._heap = []
+        self._pending = {}  # key -> (priority, seq) of its live heap entry
+        self._seq = itertools.count()
+        self._upcoming = frozenset()
+        self._mood = frozenset()
+        self._new = set()
+        self._resume_at = 0.0
+        self._cond = threading.Condition()
+        self._threads = []
+        self._stopped = False
+
+    def _priority(self, key):
+        if key in self._upcoming:
+            return PRIORITY_UPCOMING
+        if key in self._mood:
+            return PRIORITY_MOOD
+        if key in self._new:
+            return PRIORITY_NEW
+        return PRIORITY_BACKGROUND
+
+    def _push(self, key, seq):
+        priority = self._priority(key)
+        self._pending[key] = (priority, seq)
+        heapq.heappush(self._heap, (priority, seq, key))
+
+    def submit(self, key, new=False):
+        """
+        Queue key for analysis; a key already pending keeps its place in line.
+        new marks a key that no focus set can contain yet (a file just added),
+        so it runs ahead of background work.
+        """
+        with self._cond:
+            if self._stopped:
+                return
+            if new:
+                self._new.add(key)
+            if key in self._pending:
+                priority, seq = self._pending[key]
+                if self._priority(key) != priority:
+                    self._push(key, seq)  # the old heap entry goes stale
+                return
+            self._push(key, next(self._seq))
+            if len(self._threads) < self._workers:
+                thread = threading.Thread(target=self._run, daemon=True)
+                self._threads.append(thread)
+                thread.start()
+            self._cond.notify()
+
+    def set_focus(self, upcoming=None, mood=None):
+        """Replace the upcoming and/or current-mood key sets and re-rank pending keys."""
+        with self._cond:
+            if upcoming is not None:
+                self._upcoming = frozenset(upcoming)
+            if mood is not None:
+                self._mood = frozenset(mood)
+            changed = [(key, seq) for key, (priority, seq) in self._pending.items()
+                       if self._priority(key) != priority]
+            for key, seq in changed:
+                self._push(key, seq)  # the old heap entry goes stale
+            if len(self._heap) > 2 * len(self._pending) + 64:
+                self._heap = [(p, s, k) for k, (p, s) in self._pending.items()]
+                heapq.heapify(self._heap)
+
+    def hold(self, seconds=MIXER_START_HOLD):
+        """Don't start new jobs for the next seconds (a running job is not interrupted)."""
+        with self._cond:
+            self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+
+    def pending(self):
+        with self._cond:
+            return len(self._pending)
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    def _next_key(self):
+        with self._cond:
+            while True:
+                if self._stopped:
+                    return None
+                wait = self._resume_at - time.monotonic()
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+                while self._heap:
+                    priority, seq, key = heapq.heappop(self._heap)
+                    if self._pending.get(key) == (priority, seq):
+                        del self._pending[key]
+                        self._new.discard(key)
+                        return key
+                self._cond.wait()
+
+    def _run(self):
+        _lower_thread_priority(self._niceness, self._cpus)
+        while True:
+            key = self._next_key()
+            if key is None:
+                return
+            try:
+                result = self._work(key)
+            except Exception as e:
+                print(f"[ERROR] Failed to analyze {key}: {e}")
+                continue
+            if result is not None:
+                self._on_result(key, result)
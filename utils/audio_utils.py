@@ -1,4 +1,6 @@
 import os
+import subprocess
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 import librosa
 import numpy as np
 from sklearn.ensemble import RandomForestClassifier
@@ -6,9 +8,23 @@ from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score
 
+from utils.json_reader import read_json_paths
+from utils.pcm_cache import load_audio
+
+# Extractor outputs live here (inside the music folder unless told otherwise)
+ESSENTIA_CACHE_DIRNAME = ".essentia_cache"
+# Seconds before a single extractor run is killed
+ESSENTIA_TIMEOUT = 300
+# The only descriptors parse_essentia_mood needs from the (large) extractor output
+MOOD_VALENCE_PATH = ("highlevel", "mood_valence", "value")
+MOOD_AROUSAL_PATH = ("highlevel", "mood_arousal", "value")
+
+# The in-process MusicExtractor for this worker process (see _init_music_extractor)
+_music_extractor = None
+
 # Your provided extract_bpm_key function
 def extract_bpm_key(filepath):
-    y, sr = librosa.load(filepath)
+    y, sr = load_audio(filepath)
     tempo, _ = librosa.beat.beat_track(y=y, sr=sr)
 
     # tempo might still be a numpy array if extracted differently — safeguard
@@ -28,7 +44,7 @@ def extract_audio_features(audio_path, duration=30):
     """
     try:
         # Load audio file (first 'duration' seconds for efficiency)
-        y, sr = librosa.load(audio_path, duration=duration)
+        y, sr = load_audio(audio_path, duration=duration)
 
         # Extract BPM and key using provided function
         bpm, key = extract_bpm_key(audio_path)
@@ -105,53 +121,161 @@ def classify_mood(features, clf, scaler):
     features_scaled = scaler.transform([features])
     mood = clf.predict(features_scaled)[0]
     return mood
+
+def mood_from_valence_arousal(mood_valence, mood_arousal):
+    """Map Essentia's valence/arousal classes to one of our mood categories."""
+    if mood_valence == "positive" and mood_arousal == "high":
+        return "happy"
+    elif mood_valence == "negative" and mood_arousal == "high":
+        return "angry"
+    elif mood_valence == "positive" and mood_arousal == "low":
+        return "relaxed"
+    elif mood_valence == "negative" and mood_arousal == "low":
+        return "sad"
+    else:
+        return "unknown"
+
 def parse_essentia_mood(json_path):
     """
-    Read Essentia's JSON output and classify the mood.
+    Read Essentia's JSON output and classify the mood. Only the two mood
+    descriptors are decoded; the frame-level data around them is skipped.
     """
     try:
-        with open(json_path, 'r') as f:
-            data = json.load(f)
-
-        mood_valence = data['highlevel']['mood_valence']['value']
-        mood_arousal = data['highlevel']['mood_arousal']['value']
-
-        # Map to mood categories
-        if mood_valence == "positive" and mood_arousal == "high":
-            return "happy"
-        elif mood_valence == "negative" and mood_arousal == "high":
-            return "angry"
-        elif mood_valence == "positive" and mood_arousal == "low":
-            return "relaxed"
-        elif mood_valence == "negative" and mood_arousal == "low":
-            return "sad"
-        else:
-            return "unknown"
+        values = read_json_paths(json_path, [MOOD_VALENCE_PATH, MOOD_AROUSAL_PATH])
+        mood_valence = values[MOOD_VALENCE_PATH]
+        mood_arousal = values[MOOD_AROUSAL_PATH]
+        return mood_from_valence_arousal(mood_valence, mood_arousal)
     except Exception as e:
         print(f"[ERROR] Parsing failed: {e}")
         return "unknown"
 
-def process_folder_with_essentia(folder_path, extractor_path='streaming_extractor_music'):
+def essentia_output_path(cache_dir, filename):
+    """Where the extractor JSON for an audio file is cached."""
+    return os.path.join(cache_dir, filename + ".json")
+
+def is_cache_fresh(json_path, audio_path):
+    """True if json_path exists and is newer than the audio it was made from."""
+    try:
+        return os.path.getmtime(json_path) >= os.path.getmtime(audio_path)
+    except OSError:
+        return False
+
+def run_essentia_extractor(extractor_path, audio_path, json_output, timeout=ESSENTIA_TIMEOUT):
+    """
+    Run Essentia's extractor on one file. Output goes to a temporary file
+    that is renamed into place only on success, so a killed or failed run
+    never leaves a half-written JSON that looks cached.
+    """
+    tmp_output = json_output + ".tmp"
+    try:
+        subprocess.run([extractor_path, audio_path, tmp_output], check=True, timeout=timeout,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        os.replace(tmp_output, json_output)
+    finally:
+        if os.path.exists(tmp_output):
+            os.remove(tmp_output)
+
+def process_folder_with_essentia(folder_path, extractor_path='streaming_extractor_music',
+                                 cache_dir=None, max_workers=None, timeout=ESSENTIA_TIMEOUT):
     """
     Process audio files using Essentia's pre-trained model for mood detection.
+    Extractor runs go through a bounded pool of worker threads (each waits on
+    its own subprocess) with a per-file timeout. Files whose cached JSON is
+    newer than the audio are not extracted again.
     """
+    cache_dir = cache_dir or os.path.join(folder_path, ESSENTIA_CACHE_DIRNAME)
+    os.makedirs(cache_dir, exist_ok=True)
+
     mood_tags = {}
+    pending = {}
     for filename in os.listdir(folder_path):
         if filename.endswith(".mp3"):
             full_path = os.path.join(folder_path, filename)
-            json_output = full_path.replace('.mp3', '_features.json')
+            json_output = essentia_output_path(cache_dir, filename)
+            if is_cache_fresh(json_output, full_path):
+                mood_tags[filename] = parse_essentia_mood(json_output)
+            else:
+                pending[filename] = (full_path, json_output)
+    print(f"[ESSENTIA] {len(mood_tags)} cached, {len(pending)} to extract")
 
+    workers = max_workers or os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(run_essentia_extractor, extractor_path, full_path, json_output, timeout): filename
+            for filename, (full_path, json_output) in pending.items()
+        }
+        for future in as_completed(futures):
+            filename = futures[future]
             try:
-                # Run Essentia's extractor
-                run([extractor_path, full_path, json_output], check=True)
+                future.result()
 
                 # Get mood from JSON output
-                mood = parse_essentia_mood(json_output)
+                mood = parse_essentia_mood(pending[filename][1])
                 mood_tags[filename] = mood
 
                 print(f"[TAGGED] {filename} as {mood}")
 
+            except subprocess.TimeoutExpired:
+                print(f"[ERROR] Extractor timed out after {timeout}s on {filename}")
+            except Exception as e:
+                print(f"[ERROR] Failed to process {filename}: {e}")
+
+    return mood_tags
+
+
+def _init_music_extractor(profile=None, highlevel_models=None):
+    """
+    ProcessPoolExecutor initializer: configure one MusicExtractor per worker.
+    Configuring loads the profile and the SVM models, so it is done once here
+    rather than for every file.
+    """
+    global _music_extractor
+    import essentia.standard as es
+
+    params = {}
+    if profile:
+        params["profile"] = profile
+    if highlevel_models:
+        params["highlevel"] = list(highlevel_models)
+    _music_extractor = es.MusicExtractor(**params)
+
+def _pool_value(pool, path):
+    name = ".".join(path)
+    return pool[name] if name in pool.descriptorNames() else None
+
+def extract_essentia_mood(audio_path):
+    """Run this worker's MusicExtractor on one file and read the mood from the result Pool."""
+    stats, _frames = _music_extractor(audio_path)
+    return mood_from_valence_arousal(_pool_value(stats, MOOD_VALENCE_PATH),
+                                     _pool_value(stats, MOOD_AROUSAL_PATH))
+
+def process_folder_with_essentia_inprocess(folder_path, profile=None, highlevel_models=None,
+                                           max_workers=None):
+    """
+    Like process_folder_with_essentia, but runs Essentia's MusicExtractor
+    through its Python bindings instead of the command-line binary. Each
+    worker process builds a single extractor and reuses it for every file it
+    is given, and the mood is read straight from the returned Pool, so there
+    is no process spawn, extractor setup or JSON round trip per track.
+    highlevel_models are the SVM model files that provide mood_valence and
+    mood_arousal (or give a profile that lists them).
+    """
+    filenames = [f for f in os.listdir(folder_path) if f.endswith(".mp3")]
+    mood_tags = {}
+    workers = max_workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_music_extractor,
+                             initargs=(profile, highlevel_models)) as executor:
+        futures = {
+            executor.submit(extract_essentia_mood, os.path.join(folder_path, filename)): filename
+            for filename in filenames
+        }
+        for future in as_completed(futures):
+            filename = futures[future]
+            try:
+                mood = future.result()
+                mood_tags[filename] = mood
+                print(f"[TAGGED] {filename} as {mood}")
             except Exception as e:
                 print(f"[ERROR] Failed to process {filename}: {e}")
 
-    return mood_tags
\ No newline at end of file
+    return mood_tags
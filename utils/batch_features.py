@@ -0,0 +1,153 @@
+# Feature vectors for many tracks at once, computed as a few large array operations
+#
+# extract_audio_features makes a dozen librosa calls per track, and once
+# decoding is cached that per-call overhead dominates. Here the excerpts of a
+# batch of tracks are stacked into one (tracks, samples) array, and framing,
+# rfft, the mel and chroma projections, MFCCs and onset strength are each
+# computed once for the whole batch. The output has the same layout as
+# extract_audio_features (see FEATURE_COUNT in mood_detector).
+from concurrent.futures import ThreadPoolExecutor
+
+import librosa
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+import scipy.fft
+
+from utils import dsp_kernels
+from utils.pcm_cache import SAMPLE_RATE, load_audio
+
+EXCERPT_SECONDS = 30
+BATCH_SIZE = 16
+N_MFCC = 13
+# power_to_db floor and dynamic range, as in librosa
+AMIN = 1e-10
+TOP_DB = 80.0
+
+_bases = {}
+
+
+def _filter_basis(kind, sr, n_fft, tuning=0.0):
+    """librosa's mel or chroma filterbank, transposed for (frames, bins) @ basis; memoized."""
+    key = (kind, sr, n_fft, tuning)
+    if key not in _bases:
+        if kind == "mel":
+            basis = librosa.filters.mel(sr=sr, n_fft=n_fft)
+        else:
+            basis = librosa.filters.chroma(sr=sr, n_fft=n_fft, tuning=tuning)
+        _bases[key] = basis.T.astype(np.float32)
+    return _bases[key]
+
+
+def _masked_mean(values, valid):
+    """Mean over the valid frames of each track; values is (tracks, frames[, k])."""
+    weights = valid / valid.sum(axis=1, keepdims=True)
+    if values.ndim == 2:
+        return np.einsum("bt,bt->b", values, weights)
+    return np.einsum("btk,bt->bk", values, weights)
+
+
+def load_excerpts(paths, seconds=EXCERPT_SECONDS, max_workers=None):
+    """
+    Decode the first seconds of each file (in parallel threads) and stack
+    them into a zero-padded (tracks, samples) float32 array. Returns the
+    array, each track's length in samples and the indices that loaded.
+    """
+    def load(path):
+        try:
+            return load_audio(path, duration=seconds)[0]
+        except Exception as e:
+            print(f"[ERROR] Could not decode {path}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        signals = list(executor.map(load, paths))
+    loaded = [i for i, y in enumerate(signals) if y is not None and len(y) > 0]
+    lengths = np.array([len(signals[i]) for i in loaded], dtype=np.int64)
+    batch = np.zeros((len(loaded), int(lengths.max()) if len(loaded) else 0), dtype=np.float32)
+    for row, i in enumerate(loaded):
+        batch[row, :lengths[row]] = signals[i]
+    return batch, lengths, loaded
+
+
+def batch_feature_matrix(batch, lengths, sr=SAMPLE_RATE, n_fft=dsp_kernels.N_FFT,
+                         hop_length=dsp_kernels.HOP_LENGTH):
+    """
+    Feature vectors for a stacked (tracks, samples) batch; lengths gives the
+    real length of each zero-padded row. Returns a (tracks, FEATURE_COUNT)
+    array. BPM and key are estimated from the excerpt itself, where
+    extract_bpm_key looks at the whole track, so for tracks longer than the
+    excerpt those two values can differ.
+    """
+    tracks = len(batch)
+    padded = np.pad(batch, ((0, 0), (n_fft // 2, n_fft // 2)))
+    frames = sliding_window_view(padded, n_fft, axis=1)[:, ::hop_length]
+    n_frames = 1 + lengths // hop_length
+    valid = (np.arange(frames.shape[1]) < n_frames[:, None]).astype(np.float64)
+
+    spectrum = scipy.fft.rfft(frames * dsp_kernels.hann_window(n_fft), axis=-1, workers=-1)
+    magnitude = np.abs(spectrum).astype(np.float32)
+    power = magnitude ** 2
+    freqs = dsp_kernels.fft_frequencies(sr, n_fft)
+
+    rms = np.sqrt(np.einsum("btl,btl->bt", frames, frames) / n_fft)
+    total = magnitude.sum(axis=-1)
+    total[total == 0] = 1
+    centroid = (magnitude @ freqs) / total
+    cumulative = np.cumsum(magnitude, axis=-1)
+    rolloff = freqs[np.argmin(cumulative < dsp_kernels.ROLL_PERCENT * cumulative[..., -1:], axis=-1)]
+    zcr = np.zeros_like(rms)
+    for row in range(tracks):
+        track_zcr = dsp_kernels.zero_crossing_rate(batch[row, :lengths[row]], n_fft, hop_length)
+        zcr[row, :len(track_zcr)] = track_zcr
+
+    # Tuning per track as chroma_stft estimates it, with one piptrack call for the batch
+    pitch, pitch_mag = librosa.piptrack(S=power.transpose(0, 2, 1), sr=sr, n_fft=n_fft)
+    chroma = np.empty(power.shape[:2] + (12,), dtype=np.float32)
+    for row in range(tracks):
+        has_pitch = pitch[row] > 0
+        threshold = np.median(pitch_mag[row][has_pitch]) if has_pitch.any() else 0.0
+        tuning = librosa.pitch_tuning(pitch[row][(pitch_mag[row] >= threshold) & has_pitch])
+        chroma[row] = power[row] @ _filter_basis("chroma", sr, n_fft, round(float(tuning), 2))
+    peak = chroma.max(axis=-1, keepdims=True)
+    chroma = np.divide(chroma, peak, out=np.zeros_like(chroma), where=peak > 0)
+    chroma_mean = _masked_mean(chroma, valid)
+
+    mel = power @ _filter_basis("mel", sr, n_fft)
+    log_mel = 10.0 * np.log10(np.maximum(AMIN, mel))
+    log_mel = np.maximum(log_mel, log_mel.max(axis=(1, 2), keepdims=True) - TOP_DB)
+    mfcc = scipy.fft.dct(log_mel, type=2, norm="ortho", axis=-1)[..., :N_MFCC]
+
+    # Onset strength as librosa.beat.beat_track computes it, then its tempo estimate
+    onset = np.median(np.maximum(0.0, log_mel[:, 1:] - log_mel[:, :-1]), axis=-1)
+    onset = np.pad(onset, ((0, 0), (1 + n_fft // (2 * hop_length), 0)))
+    # Tracks of the same length (normally all full-length excerpts) share one tempo call
+    bpm = np.zeros(tracks)
+    for length in np.unique(n_frames):
+        rows = np.flatnonzero((n_frames == length) & onset[:, :length].any(axis=1))
+        if len(rows):
+            tempo = librosa.feature.tempo(onset_envelope=onset[rows, :length], sr=sr, hop_length=hop_length)
+            bpm[rows] = np.round(tempo.reshape(len(rows)))
+    major = np.isin(chroma_mean.argmax(axis=1), [0, 5, 7]).astype(np.float64)
+
+    return np.column_stack([
+        bpm, major,
+        _masked_mean(rms, valid), _masked_mean(centroid, valid), _masked_mean(rolloff, valid),
+        _masked_mean(zcr, valid), chroma_mean.mean(axis=1),
+        _masked_mean(mfcc, valid),
+    ])
+
+
+def extract_features_batch(paths, seconds=EXCERPT_SECONDS, batch_size=BATCH_SIZE, max_workers=None):
+    """
+    Feature vectors for paths, batch_size tracks at a time. Returns a list
+    aligned with paths holding a vector, or None where decoding failed.
+    """
+    vectors = [None] * len(paths)
+    for start in range(0, len(paths), batch_size):
+        chunk = paths[start:start + batch_size]
+        batch, lengths, loaded = load_excerpts(chunk, seconds, max_workers)
+        if not loaded:
+            continue
+        for i, vector in zip(loaded, batch_feature_matrix(batch, lengths)):
+            vectors[start + i] = vector
+    return vectors
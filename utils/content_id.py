@@ -0,0 +1,50 @@
+# Identify a track by its audio bytes, so stored results survive renames, moves and retagging
+import hashlib
+import os
+
+from utils.metadata import id3v2_size
+
+# Bytes hashed from each of SAMPLE_BLOCKS evenly spaced places in the audio data
+BLOCK_SIZE = 64 * 1024
+SAMPLE_BLOCKS = 4
+ID3V1_SIZE = 128
+
+
+def audio_span(f, file_size):
+    """(start, end) byte range of f that holds audio, excluding ID3v2 and ID3v1 tags."""
+    f.seek(0)
+    start = min(id3v2_size(f.read(10)), file_size)
+    end = file_size
+    if end - start >= ID3V1_SIZE:
+        f.seek(end - ID3V1_SIZE)
+        if f.read(3) == b"TAG":
+            end -= ID3V1_SIZE
+    return start, end
+
+
+def content_id(path):
+    """
+    "<audio bytes>-<digest>" for the file at path: the size of its audio data
+    plus a BLAKE2b digest of a few blocks sampled across it. Editing tags
+    (which rewrites the ID3 headers) or renaming or moving the file leaves it
+    unchanged; reading it costs a few small reads, no decode.
+    """
+    with open(path, "rb") as f:
+        start, end = audio_span(f, os.fstat(f.fileno()).st_size)
+        length = end - start
+        digest = hashlib.blake2b(digest_size=16)
+        if length <= SAMPLE_BLOCKS * BLOCK_SIZE:
+            f.seek(start)
+            digest.update(f.read(length))
+        else:
+            step = (length - BLOCK_SIZE) // (SAMPLE_BLOCKS - 1)
+            for i in range(SAMPLE_BLOCKS):
+                f.seek(start + i * step)
+                digest.update(f.read(BLOCK_SIZE))
+    return f"{length}-{digest.hexdigest()}"
+
+
+def content_index(analysis):
+    """content id -> filename for analysis entries that record one."""
+    return {entry["content_id"]: filename for filename, entry in analysis.items()
+            if entry.get("content_id")}
@@ -0,0 +1,70 @@
+# Talk to the player daemon (utils/player_daemon.py) over its local control socket
+#
+# The protocol is one JSON object per line in each direction. A request names
+# a command plus its arguments, e.g. {"cmd": "seek", "seconds": 90}; the reply
+# is {"ok": true, ...} or {"ok": false, "error": "..."}.
+import json
+import os
+import socket
+import tempfile
+
+SOCKET_ENV = "MUSIC_PLAYER_SOCKET"
+# Used instead of a Unix socket where the platform has none (Windows)
+TCP_ADDRESS = ("127.0.0.1", 47615)
+
+
+def daemon_address():
+    """Unix socket path for the daemon, or TCP_ADDRESS where AF_UNIX is unavailable."""
+    if not hasattr(socket, "AF_UNIX"):
+        return TCP_ADDRESS
+    if os.environ.get(SOCKET_ENV):
+        return os.environ[SOCKET_ENV]
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    user = os.getuid() if hasattr(os, "getuid") else "user"
+    return os.path.join(runtime_dir, f"smart_music_player-{user}.sock")
+
+
+def open_socket(address):
+    family = socket.AF_INET if isinstance(address, tuple) else socket.AF_UNIX
+    return socket.socket(family, socket.SOCK_STREAM)
+
+
+class DaemonError(Exception):
+    """The daemon refused a command."""
+
+
+class DaemonClient:
+    """A connection to a running daemon; call(cmd, **args) returns the reply dict."""
+
+    def __init__(self, address=None, timeout=5.0):
+        self.address = address or daemon_address()
+        self._sock = open_socket(self.address)
+        self._sock.settimeout(timeout)
+        try:
+            self._sock.connect(self.address)
+        except OSError:
+            self._sock.close()
+            raise
+        self._reader = self._sock.makefile("r", encoding="utf-8")
+
+    def call(self, cmd, **args):
+        self._sock.sendall((json.dumps(dict(args, cmd=cmd)) + "\n").encode("utf-8"))
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("Player daemon closed the connection")
+        reply = json.loads(line)
+        if not reply.get("ok"):
+            raise DaemonError(reply.get("error", "unknown error"))
+        return reply
+
+    def close(self):
+        self._reader.close()
+        self._sock.close()
+
+
+def connect(address=None, timeout=5.0):
+    """DaemonClient for a running daemon, or None if none is listening."""
+    try:
+        return DaemonClient(address, timeout)
+    except OSError:
+        return None
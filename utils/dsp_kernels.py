@@ -0,0 +1,93 @@
+# Frame-level audio descriptors in plain NumPy, without importing librosa
+#
+# Defaults match librosa's (n_fft 2048, hop 512, centred frames padded with
+# zeros, periodic Hann window), so values agree with librosa.feature.* to
+# float32 rounding.
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+N_FFT = 2048
+HOP_LENGTH = 512
+ROLL_PERCENT = 0.85
+# Samples this close to zero count as zero (non-negative) for zero crossings
+ZERO_THRESHOLD = 1e-10
+
+
+def frame(y, frame_length=N_FFT, hop_length=HOP_LENGTH):
+    """(n_frames, frame_length) read-only view of y; no samples are copied."""
+    if len(y) < frame_length:
+        raise ValueError(f"Signal of {len(y)} samples is shorter than one frame ({frame_length})")
+    return sliding_window_view(y, frame_length)[::hop_length]
+
+
+def centered_frames(y, frame_length=N_FFT, hop_length=HOP_LENGTH):
+    """Frames centred on multiples of hop_length, with zero padding at both ends."""
+    padded = np.pad(y, frame_length // 2)
+    return frame(padded, frame_length, hop_length)
+
+
+def hann_window(n):
+    """Periodic Hann window, as used for STFTs."""
+    return (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(n) / n)).astype(np.float32)
+
+
+def fft_frequencies(sr, n_fft=N_FFT):
+    """Centre frequency of each rfft bin."""
+    return np.fft.rfftfreq(n_fft, 1.0 / sr)
+
+
+def rms(frames):
+    """Root-mean-square energy of each frame."""
+    return np.sqrt(np.einsum("ij,ij->i", frames, frames) / frames.shape[1])
+
+
+def zero_crossing_rate(y, frame_length=N_FFT, hop_length=HOP_LENGTH):
+    """
+    Fraction of zero crossings in each centred frame (the signal is edge
+    padded, as librosa does). Crossings are found once over the whole signal
+    and counted per frame with a cumulative sum, so no frames are built.
+    """
+    negative = np.signbit(np.where(np.abs(y) <= ZERO_THRESHOLD, 0, y))
+    crossings = np.zeros(len(y) + 2 * (frame_length // 2), dtype=np.int64)
+    crossings[frame_length // 2 + 1:frame_length // 2 + len(y)] = negative[1:] != negative[:-1]
+    counts = np.cumsum(crossings)
+    starts = np.arange(0, len(crossings) - frame_length + 1, hop_length)
+    return (counts[starts + frame_length - 1] - counts[starts]) / frame_length
+
+
+def magnitude_spectrogram(frames):
+    """|rfft| of each Hann-windowed frame, shape (n_frames, n_fft // 2 + 1)."""
+    return np.abs(np.fft.rfft(frames * hann_window(frames.shape[1]), axis=1)).astype(np.float32)
+
+
+def spectral_centroid(S, freqs):
+    """Magnitude-weighted mean frequency of each frame of S."""
+    total = S.sum(axis=1)
+    total[total == 0] = 1
+    return (S @ freqs) / total
+
+
+def spectral_rolloff(S, freqs, roll_percent=ROLL_PERCENT):
+    """Frequency below which roll_percent of each frame's magnitude lies."""
+    cumulative = np.cumsum(S, axis=1)
+    below = cumulative < roll_percent * cumulative[:, -1:]
+    return freqs[np.argmin(below, axis=1)]
+
+
+def frame_descriptors(y, sr, n_fft=N_FFT, hop_length=HOP_LENGTH):
+    """
+    RMS, spectral centroid, spectral rolloff and zero-crossing rate per frame,
+    all from one framing of y. Returns (descriptors dict, magnitude
+    spectrogram) so callers can reuse the spectrogram for other features.
+    """
+    y = np.ascontiguousarray(y, dtype=np.float32)
+    frames = centered_frames(y, n_fft, hop_length)
+    S = magnitude_spectrogram(frames)
+    freqs = fft_frequencies(sr, n_fft)
+    descriptors = {
+        "rms": rms(frames),
+        "spectral_centroid": spectral_centroid(S, freqs),
+        "spectral_rolloff": spectral_rolloff(S, freqs),
+        "zero_crossing_rate": zero_crossing_rate(y, n_fft, hop_length),
+    }
+    return descriptors, S
@@ -0,0 +1,112 @@
+# Coarse audio fingerprint for spotting the same recording under different files
+import numpy as np
+
+from utils import dsp_kernels
+
+FINGERPRINT_SR = 11025
+# Decode this much from the start, then fingerprint a window after any leading silence
+DECODE_SECONDS = 25
+WINDOW_SECONDS = 15
+# Samples quieter than this relative to the peak count as leading silence
+SILENCE_DB = -40
+# Log-spaced bands between these frequencies, compared across 1-second blocks
+BAND_COUNT = 17
+BAND_RANGE = (300.0, 3000.0)
+BLOCK_SECONDS = 1.0
+# Different encodes of one recording differ in a few percent of the bits, other recordings in half
+MAX_BIT_ERROR = 0.15
+# Lookup buckets: fingerprints agreeing exactly on any one chunk of this many bits are compared
+CHUNK_BITS = 14
+
+
+def _band_energies(y, sr):
+    """Energy in BAND_COUNT log-spaced bands for each BLOCK_SECONDS block, shape (blocks, bands)."""
+    frames = dsp_kernels.centered_frames(y, 2048, 1024)
+    power = dsp_kernels.magnitude_spectrogram(frames) ** 2
+    freqs = dsp_kernels.fft_frequencies(sr, 2048)
+    edges = np.geomspace(BAND_RANGE[0], BAND_RANGE[1], BAND_COUNT + 1)
+    band_of_bin = np.searchsorted(edges, freqs) - 1
+    in_range = (band_of_bin >= 0) & (band_of_bin < BAND_COUNT)
+    bands = np.zeros((len(power), BAND_COUNT))
+    np.add.at(bands.T, band_of_bin[in_range], power[:, in_range].T)
+    per_block = max(1, int(round(BLOCK_SECONDS * sr / 1024)))
+    blocks = len(bands) // per_block
+    return bands[:blocks * per_block].reshape(blocks, per_block, BAND_COUNT).sum(axis=1)
+
+
+def fingerprint_signal(y, sr=FINGERPRINT_SR):
+    """
+    Fingerprint of a mono signal: after skipping leading silence, the sign of
+    each band-to-band energy change between consecutive one-second blocks
+    (the Haitsma-Kalker scheme, on a much coarser grid so that different
+    encodes and bitrates of a recording differ in only a few bits). Returns
+    "<bits>:<hex>", or None for audio too short or too flat to identify.
+    """
+    if len(y) == 0:
+        return None
+    level = np.abs(y)
+    peak = level.max()
+    if peak == 0:
+        return None
+    start = int(np.argmax(level > peak * 10 ** (SILENCE_DB / 20)))
+    y = np.asarray(y[start:start + int(WINDOW_SECONDS * sr)], dtype=np.float32)
+    if len(y) < 4 * BLOCK_SECONDS * sr:
+        return None
+    energies = _band_energies(y, sr)
+    bits = (np.diff(np.diff(energies, axis=1), axis=0) > 0).ravel()
+    if not bits.any() or bits.all():
+        return None
+    return f"{len(bits)}:{np.packbits(bits).tobytes().hex()}"
+
+
+def _unpack(fingerprint):
+    count, packed = fingerprint.split(":")
+    return np.unpackbits(np.frombuffer(bytes.fromhex(packed), dtype=np.uint8))[:int(count)]
+
+
+class FingerprintIndex:
+    """
+    Maps fingerprints to values and finds the value stored under a
+    near-identical fingerprint (at most MAX_BIT_ERROR of the bits differ).
+    Candidates come from buckets keyed by each CHUNK_BITS-bit chunk, so a
+    lookup compares against a handful of fingerprints, not the library.
+    """
+
+    def __init__(self):
+        self._buckets = {}
+        self._entries = []
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _chunks(self, bits):
+        for i, offset in enumerate(range(0, len(bits) - CHUNK_BITS + 1, CHUNK_BITS)):
+            yield (len(bits), i, np.packbits(bits[offset:offset + CHUNK_BITS]).tobytes())
+
+    def add(self, fingerprint, value):
+        bits = _unpack(fingerprint)
+        position = len(self._entries)
+        self._entries.append((bits, value))
+        for chunk in self._chunks(bits):
+            self._buckets.setdefault(chunk, []).append(position)
+
+    def find(self, fingerprint):
+        """Value of the closest stored fingerprint within MAX_BIT_ERROR, or None."""
+        bits = _unpack(fingerprint)
+        candidates = set()
+        for chunk in self._chunks(bits):
+            candidates.update(self._buckets.get(chunk, ()))
+        best, best_error = None, MAX_BIT_ERROR
+        for position in candidates:
+            stored, value = self._entries[position]
+            error = np.count_nonzero(stored != bits) / len(bits)
+            if error <= best_error:
+                best, best_error = value, error
+        return best
+
+
+def audio_fingerprint(audio_path):
+    """Fingerprint from a short low-rate decode of the start of the file (see fingerprint_signal)."""
+    import librosa
+    y, sr = librosa.load(audio_path, sr=FINGERPRINT_SR, mono=True, duration=DECODE_SECONDS)
+    return fingerprint_signal(y, sr)
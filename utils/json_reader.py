@@ -0,0 +1,129 @@
+# Pull a few values out of a large JSON file without parsing all of it
+import json
+import mmap
+import re
+
+_WHITESPACE = re.compile(rb"[ \t\r\n]*")
+_STRING_BODY = re.compile(rb'(?:[^"\\]|\\.)*"', re.DOTALL)
+_STRUCTURAL = re.compile(rb'["{}\[\]]')
+_SCALAR_END = re.compile(rb"[,}\]\s]")
+
+
+class _Reader:
+    """
+    Walks a JSON document held in a bytes-like buffer. Values we don't want
+    are skipped with regex searches that jump between quotes and brackets, so
+    big frame-level arrays are passed over at C speed and never turned into
+    Python objects.
+    """
+
+    def __init__(self, buf):
+        self.buf = buf
+
+    def ws(self, pos):
+        return _WHITESPACE.match(self.buf, pos).end()
+
+    def expect(self, pos, char):
+        pos = self.ws(pos)
+        if self.buf[pos:pos + 1] != char:
+            raise ValueError(f"Expected {char!r} at byte {pos}")
+        return pos + 1
+
+    def string(self, pos):
+        end = _STRING_BODY.match(self.buf, pos + 1).end()
+        return json.loads(self.buf[pos:end]), end
+
+    def skip(self, pos):
+        """Return the position just past the value starting at pos."""
+        first = self.buf[pos:pos + 1]
+        if first == b'"':
+            return _STRING_BODY.match(self.buf, pos + 1).end()
+        if first not in (b"{", b"["):
+            match = _SCALAR_END.search(self.buf, pos)
+            return match.start() if match else len(self.buf)
+        return self.skip_rest(pos, 0)
+
+    def skip_rest(self, pos, depth=1):
+        """Return the position just past the container we are depth levels inside."""
+        while True:
+            match = _STRUCTURAL.search(self.buf, pos)
+            if match is None:
+                raise ValueError("Unterminated JSON value")
+            char = match.group()
+            if char == b'"':
+                pos = _STRING_BODY.match(self.buf, match.end()).end()
+                continue
+            depth += 1 if char in (b"{", b"[") else -1
+            pos = match.end()
+            if depth == 0:
+                return pos
+
+    def decode(self, pos):
+        end = self.skip(pos)
+        return json.loads(self.buf[pos:end]), end
+
+    def collect(self, pos, wanted, prefix, found):
+        """
+        Walk the object at pos, storing values for the paths in wanted (a
+        nested dict of key -> sub-dict, None marking a requested leaf) into
+        found, and return the position after the object. At the top level
+        (empty prefix) it returns None as soon as everything was found,
+        without reading the rest of the file.
+        """
+        pos = self.expect(pos, b"{")
+        remaining = len(wanted)
+        pos = self.ws(pos)
+        if self.buf[pos:pos + 1] == b"}":
+            return pos + 1
+        while True:
+            pos = self.ws(pos)
+            key, pos = self.string(pos)
+            pos = self.ws(self.expect(pos, b":"))
+            if key in wanted:
+                path = prefix + (key,)
+                if wanted[key] is None:
+                    found[path], pos = self.decode(pos)
+                elif self.buf[pos:pos + 1] == b"{":
+                    pos = self.collect(pos, wanted[key], path, found)
+                else:
+                    pos = self.skip(pos)
+                remaining -= 1
+                if remaining == 0:
+                    return None if not prefix else self.skip_rest(pos)
+            else:
+                pos = self.skip(pos)
+            pos = self.ws(pos)
+            char = self.buf[pos:pos + 1]
+            if char == b"}":
+                return pos + 1
+            if char != b",":
+                raise ValueError(f"Expected ',' or '}}' at byte {pos}")
+            pos += 1
+
+
+def read_json_paths(json_path, paths):
+    """
+    Read only the values at the given key paths, e.g.
+    [("highlevel", "mood_valence", "value")], from a JSON object file.
+    Returns {path: value} for the paths that exist; scanning stops as soon as
+    all of them have been seen.
+    """
+    wanted = {}
+    for path in paths:
+        node = wanted
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+        node[path[-1]] = None
+
+    found = {}
+    with open(json_path, "rb") as f:
+        try:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return found  # empty file
+        try:
+            reader = _Reader(buf)
+            reader.collect(reader.ws(0), wanted, (), found)
+        finally:
+            buf.close()
+    return found
@@ -0,0 +1,127 @@
+# One library over several music folders (local disk, NAS mounts) with a single tag store
+#
+#   python -m utils.library add path/to/music
+#   python -m utils.library remove path/to/music
+#   python -m utils.library list
+#
+# The store directory holds the usual mood_tags.json, analysis.json,
+# mood_corrections.json and metadata cache, keyed by absolute path, plus the
+# list of registered roots. A recording present under several roots is
+# analysed once (see process_files in mood_detector).
+import argparse
+import os
+
+from utils.metadata import METADATA_FILENAME
+from utils.tag_manager import (ANALYSIS_FILENAME, CORRECTIONS_FILENAME, MOOD_TAGS_FILENAME,
+                               load_tags, save_tags)
+
+LIBRARY_DIR_ENV = "MUSIC_PLAYER_LIBRARY"
+DEFAULT_LIBRARY_DIR = os.path.join(os.path.expanduser("~"), ".smart_music_player")
+ROOTS_FILENAME = "library_roots.json"
+STORE_FILENAMES = (MOOD_TAGS_FILENAME, ANALYSIS_FILENAME, CORRECTIONS_FILENAME, METADATA_FILENAME)
+
+
+def library_dir():
+    """Store directory: $MUSIC_PLAYER_LIBRARY, or ~/.smart_music_player."""
+    return os.environ.get(LIBRARY_DIR_ENV) or DEFAULT_LIBRARY_DIR
+
+
+def _load(path):
+    return load_tags(path) if os.path.exists(path) else {}
+
+
+def load_roots(store_dir):
+    """Registered root folders, in the order they were added."""
+    return _load(os.path.join(store_dir, ROOTS_FILENAME)).get("roots", [])
+
+
+def save_roots(store_dir, roots):
+    os.makedirs(store_dir, exist_ok=True)
+    save_tags(os.path.join(store_dir, ROOTS_FILENAME), {"roots": roots})
+
+
+def add_root(store_dir, folder_path):
+    """
+    Register folder_path and return its normalised path. Tags, analysis and
+    retags already saved inside the folder are copied into the store (for
+    tracks the store doesn't know yet), so adding it needs no analysis.
+    """
+    root = os.path.realpath(folder_path)
+    roots = load_roots(store_dir)
+    if root in roots:
+        return root
+    for filename in STORE_FILENAMES:
+        try:
+            local = _load(os.path.join(root, filename))
+        except Exception as e:
+            print(f"[ERROR] Ignoring unreadable {os.path.join(root, filename)}: {e}")
+            continue
+        if not local:
+            continue
+        store_path = os.path.join(store_dir, filename)
+        stored = _load(store_path)
+        for name, value in local.items():
+            stored.setdefault(os.path.join(root, name), value)
+        os.makedirs(store_dir, exist_ok=True)
+        save_tags(store_path, stored)
+    save_roots(store_dir, roots + [root])
+    return root
+
+
+def remove_root(store_dir, folder_path):
+    """Unregister folder_path and drop its tracks from the store."""
+    root = os.path.realpath(folder_path)
+    roots = load_roots(store_dir)
+    if root not in roots:
+        return False
+    prefix = os.path.join(root, "")
+    for filename in STORE_FILENAMES:
+        store_path = os.path.join(store_dir, filename)
+        stored = _load(store_path)
+        kept = {song: value for song, value in stored.items() if not song.startswith(prefix)}
+        if len(kept) != len(stored):
+            save_tags(store_path, kept)
+    save_roots(store_dir, [r for r in roots if r != root])
+    return True
+
+
+def library_files(roots, extensions=(".mp3",)):
+    """
+    Absolute paths of the audio files directly inside each root. Roots that
+    are not currently available (an unmounted NAS share) are skipped.
+    """
+    files = []
+    for root in roots:
+        try:
+            names = os.listdir(root)
+        except OSError as e:
+            print(f"[ERROR] Skipping unavailable library folder {root}: {e}")
+            continue
+        files.extend(os.path.join(root, name) for name in sorted(names) if name.lower().endswith(extensions))
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the folders of the shared music library.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("add", help="register a music folder").add_argument("folder")
+    commands.add_parser("remove", help="unregister a music folder").add_argument("folder")
+    commands.add_parser("list", help="show registered folders")
+    args = parser.parse_args()
+
+    store_dir = library_dir()
+    if args.command == "add":
+        if not os.path.isdir(args.folder):
+            parser.error(f"{args.folder} is not a directory")
+        print(f"[LIBRARY] Added {add_root(store_dir, args.folder)}")
+    elif args.command == "remove":
+        if not remove_root(store_dir, args.folder):
+            parser.error(f"{args.folder} is not in the library")
+        print(f"[LIBRARY] Removed {os.path.realpath(args.folder)}")
+    else:
+        for root in load_roots(store_dir):
+            print(root if os.path.isdir(root) else f"{root} (unavailable)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+# Watch a music folder for added, removed and modified audio files
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+import time
+
+# inotify event masks (see inotify(7))
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+
+INOTIFY_EVENT = struct.Struct("iIII")
+
+
+def snapshot(folder_path, extensions):
+    """Map each audio file name in folder_path to its (mtime_ns, size)."""
+    entries = {}
+    with os.scandir(folder_path) as it:
+        for entry in it:
+            if entry.name.lower().endswith(extensions) and entry.is_file():
+                stat = entry.stat()
+                entries[entry.name] = (stat.st_mtime_ns, stat.st_size)
+    return entries
+
+
+def diff_snapshots(old, new):
+    """Return (added, removed, modified) file names between two snapshots."""
+    added = [name for name in new if name not in old]
+    removed = [name for name in old if name not in new]
+    modified = [name for name, sig in new.items() if name in old and old[name] != sig]
+    return added, removed, modified
+
+
+class _Inotify:
+    """Minimal inotify binding through ctypes; raises OSError where unavailable."""
+
+    def __init__(self, path):
+        libc_name = ctypes.util.find_library("c")
+        if not libc_name:
+            raise OSError("libc not found")
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify not supported")
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, "inotify_add_watch failed")
+
+    def read_events(self, timeout):
+        """Yield (mask, name) for events arriving within timeout seconds."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset + INOTIFY_EVENT.size <= len(data):
+            _, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            yield mask, os.fsdecode(name)
+
+    def close(self):
+        os.close(self.fd)
+
+
+class LibraryWatcher:
+    """
+    Reports changes to the audio files directly inside a folder by calling
+    on_change(added, removed, modified) from a background thread.
+
+    Uses inotify when the platform provides it, so work is proportional to the
+    number of changed files. Elsewhere it polls: the folder's own mtime changes
+    whenever a file is added, removed or renamed, so the full scandir snapshot
+    only runs when that happens, plus every full_rescan_every polls to catch
+    files rewritten in place.
+    """
+
+    def __init__(self, folder_path, on_change, extensions=(".mp3",), interval=5.0,
+                 settle=1.0, full_rescan_every=12):
+        self.folder_path = folder_path
+        self.on_change = on_change
+        self.extensions = extensions
+        self.interval = interval
+        self.settle = settle
+        self.full_rescan_every = full_rescan_every
+        self._snapshot = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self.using_inotify = False
+
+    def start(self):
+        self._snapshot = snapshot(self.folder_path, self.extensions)
+        try:
+            inotify = _Inotify(self.folder_path)
+            self.using_inotify = True
+            target = lambda: self._run_inotify(inotify)
+        except (OSError, AttributeError):
+            target = self._run_polling
+        self._thread = threading.Thread(target=target, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _emit(self, added, removed, modified):
+        if added or removed or modified:
+            try:
+                self.on_change(added, removed, modified)
+            except Exception as e:
+                print(f"[ERROR] Library change handler failed: {e}")
+
+    def _stat(self, name):
+        try:
+            stat = os.stat(os.path.join(self.folder_path, name))
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+    def _rescan(self):
+        new = snapshot(self.folder_path, self.extensions)
+        changes = diff_snapshots(self._snapshot, new)
+        self._snapshot = new
+        self._emit(*changes)
+
+    def _run_polling(self):
+        polls = 0
+        last_dir_mtime = os.stat(self.folder_path).st_mtime_ns
+        while not self._stop.wait(self.interval):
+            polls += 1
+            try:
+                dir_mtime = os.stat(self.folder_path).st_mtime_ns
+                if dir_mtime != last_dir_mtime or polls >= self.full_rescan_every:
+                    last_dir_mtime = dir_mtime
+                    polls = 0
+                    self._rescan()
+            except OSError as e:
+                print(f"[ERROR] Library poll failed for {self.folder_path}: {e}")
+
+    def _run_inotify(self, inotify):
+        try:
+            while not self._stop.is_set():
+                touched = set()
+                overflow = False
+                # Collect a burst of events, then settle so copies finish before we report
+                deadline = None
+                while not self._stop.is_set():
+                    timeout = 1.0 if deadline is None else max(deadline - time.monotonic(), 0)
+                    got_event = False
+                    for mask, name in inotify.read_events(timeout):
+                        got_event = True
+                        if mask & IN_Q_OVERFLOW:
+                            overflow = True
+                        elif mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                            return
+                        elif name.lower().endswith(self.extensions):
+                            touched.add(name)
+                    if got_event:
+                        deadline = time.monotonic() + self.settle
+                    elif deadline is not None and time.monotonic() >= deadline:
+                        break
+                if overflow:
+                    self._rescan()
+                    continue
+                added, removed, modified = [], [], []
+                for name in touched:
+                    sig = self._stat(name)
+                    old = self._snapshot.get(name)
+                    if sig is None:
+                        if old is not None:
+                            del self._snapshot[name]
+                            removed.append(name)
+                    elif old is None:
+                        self._snapshot[name] = sig
+                        added.append(name)
+                    elif old != sig:
+                        self._snapshot[name] = sig
+                        modified.append(name)
+                self._emit(added, removed, modified)
+        finally:
+            inotify.close()
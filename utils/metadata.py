@@ -0,0 +1,388 @@
+# Library metadata scan: duration, bitrate, channels, tags and cover presence
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+
+from mutagen import File as MutagenFile
+from mutagen.id3 import ID3, ID3NoHeaderError
+
+METADATA_FILENAME = "metadata.json"
+
+# How far past the ID3 tag we look for the first MPEG frame
+MP3_SYNC_SEARCH_BYTES = 64 * 1024
+
+MP3_BITRATES = {
+    (1, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (1, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (1, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (2, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (2, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+MP3_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],  # MPEG 1
+    2: [22050, 24000, 16000],  # MPEG 2
+    0: [11025, 12000, 8000],   # MPEG 2.5
+}
+
+# Tag keys for ID3, Vorbis comments and MP4 atoms
+TAG_KEYS = {
+    "title": ("TIT2", "title", "\xa9nam"),
+    "artist": ("TPE1", "artist", "\xa9ART"),
+    "album": ("TALB", "album", "\xa9alb"),
+}
+
+
+def id3v2_size(header):
+    """Return the total size of an ID3v2 tag from its 10-byte header, or 0."""
+    if len(header) < 10 or header[:3] != b"ID3":
+        return 0
+    size = 0
+    for b in header[6:10]:
+        size = (size << 7) | (b & 0x7F)
+    footer = 10 if header[5] & 0x10 else 0
+    return size + 10 + footer
+
+
+def _parse_mp3_frame_header(data, pos):
+    """Decode the MPEG audio frame header at data[pos:pos+4], or return None."""
+    if pos + 4 > len(data) or data[pos] != 0xFF or (data[pos + 1] & 0xE0) != 0xE0:
+        return None
+    b1, b2, b3 = data[pos + 1], data[pos + 2], data[pos + 3]
+    version_bits = (b1 >> 3) & 0x03
+    layer_bits = (b1 >> 1) & 0x03
+    bitrate_idx = b2 >> 4
+    sr_idx = (b2 >> 2) & 0x03
+    if version_bits == 1 or layer_bits == 0 or bitrate_idx in (0, 15) or sr_idx == 3:
+        return None
+
+    layer = 4 - layer_bits
+    mpeg1 = version_bits == 3
+    bitrate = MP3_BITRATES[(1 if mpeg1 else 2, layer)][bitrate_idx] * 1000
+    sample_rate = MP3_SAMPLE_RATES[version_bits][sr_idx]
+    padding = (b2 >> 1) & 0x01
+    mono = (b3 >> 6) == 3
+
+    if layer == 1:
+        samples_per_frame = 384
+        frame_length = (12 * bitrate // sample_rate + padding) * 4
+    elif layer == 2 or mpeg1:
+        samples_per_frame = 1152
+        frame_length = 144 * bitrate // sample_rate + padding
+    else:
+        samples_per_frame = 576
+        frame_length = 72 * bitrate // sample_rate + padding
+
+    return {
+        "mpeg1": mpeg1,
+        "layer": layer,
+        "bitrate": bitrate,
+        "sample_rate": sample_rate,
+        "channels": 1 if mono else 2,
+        "samples_per_frame": samples_per_frame,
+        "frame_length": frame_length,
+    }
+
+
+def _read_mp3_info(f, file_size):
+    """Duration/bitrate/channels from the first MPEG frame and its Xing/Info or VBRI header."""
+    head = f.read(10)
+    audio_start = id3v2_size(head)
+    f.seek(audio_start)
+    data = f.read(MP3_SYNC_SEARCH_BYTES)
+
+    frame = None
+    pos = data.find(b"\xff")
+    while pos != -1:
+        frame = _parse_mp3_frame_header(data, pos)
+        # Require a second valid header right after the first to rule out false syncs
+        if frame and (pos + frame["frame_length"] + 4 > len(data)
+                      or _parse_mp3_frame_header(data, pos + frame["frame_length"])):
+            break
+        frame = None
+        pos = data.find(b"\xff", pos + 1)
+    if frame is None:
+        return None
+    audio_start += pos
+
+    # Xing/Info header sits right after the side information of the first frame
+    if frame["mpeg1"]:
+        side_info = 17 if frame["channels"] == 1 else 32
+    else:
+        side_info = 9 if frame["channels"] == 1 else 17
+    xing_pos = pos + 4 + side_info
+    frames = None
+    audio_bytes = None
+    delay_padding = 0
+    tag = data[xing_pos:xing_pos + 4]
+    if tag in (b"Xing", b"Info"):
+        flags = struct.unpack(">I", data[xing_pos + 4:xing_pos + 8])[0]
+        offset = xing_pos + 8
+        if flags & 0x1:
+            frames = struct.unpack(">I", data[offset:offset + 4])[0]
+            offset += 4
+        if flags & 0x2:
+            audio_bytes = struct.unpack(">I", data[offset:offset + 4])[0]
+            offset += 4
+        if flags & 0x4:
+            offset += 100
+        if flags & 0x8:
+            offset += 4
+        # LAME extension: encoder delay and padding are 12 bits each at byte 21
+        if data[offset:offset + 4] == b"LAME" and len(data) >= offset + 24:
+            b = data[offset + 21:offset + 24]
+            delay_padding = ((b[0] << 4) | (b[1] >> 4)) + (((b[1] & 0x0F) << 8) | b[2])
+    elif data[pos + 36:pos + 40] == b"VBRI":
+        vbri = pos + 36
+        audio_bytes, frames = struct.unpack(">II", data[vbri + 10:vbri + 18])
+
+    if frames:
+        samples = frames * frame["samples_per_frame"] - delay_padding
+        duration = max(samples, 0) / frame["sample_rate"]
+        if not audio_bytes:
+            audio_bytes = file_size - audio_start
+        bitrate = int(audio_bytes * 8 / duration) if duration else frame["bitrate"]
+    else:
+        # CBR: size of the audio payload over the bitrate, minus a trailing ID3v1 tag
+        f.seek(max(file_size - 128, 0))
+        tail = 128 if f.read(3) == b"TAG" else 0
+        bitrate = frame["bitrate"]
+        duration = (file_size - audio_start - tail) * 8 / bitrate
+
+    return {"duration": duration, "bitrate": bitrate, "channels": frame["channels"]}
+
+
+def _read_flac_info(f, file_size):
+    """Duration/bitrate/channels from the FLAC STREAMINFO block."""
+    head = f.read(10)
+    start = id3v2_size(head)
+    f.seek(start)
+    if f.read(4) != b"fLaC":
+        return None
+    block_header = f.read(4)
+    if len(block_header) < 4 or (block_header[0] & 0x7F) != 0:
+        return None
+    info = f.read(34)
+    if len(info) < 34:
+        return None
+    packed = int.from_bytes(info[10:18], "big")
+    sample_rate = packed >> 44
+    channels = ((packed >> 41) & 0x07) + 1
+    total_samples = packed & 0xFFFFFFFFF
+    if not sample_rate or not total_samples:
+        return None
+    duration = total_samples / sample_rate
+    return {"duration": duration, "bitrate": int(file_size * 8 / duration), "channels": channels}
+
+
+def _iter_mp4_atoms(f, start, end):
+    """Yield (type, payload_start, atom_end) for the atoms between start and end."""
+    pos = start
+    while pos + 8 <= end:
+        f.seek(pos)
+        header = f.read(8)
+        if len(header) < 8:
+            return
+        size, kind = struct.unpack(">I4s", header)
+        payload = pos + 8
+        if size == 1:
+            size = struct.unpack(">Q", f.read(8))[0]
+            payload += 8
+        elif size == 0:
+            size = end - pos
+        if size < 8:
+            return
+        yield kind, payload, pos + size
+        pos += size
+
+
+def _find_mp4_atom(f, start, end, path):
+    """Locate a nested atom such as moov/mvhd, seeking over everything else."""
+    for kind, payload, atom_end in _iter_mp4_atoms(f, start, end):
+        if kind == path[0]:
+            if len(path) == 1:
+                return payload, atom_end
+            # stsd carries an 8-byte version/count prefix before its children
+            child_start = payload + 8 if kind == b"stsd" else payload
+            found = _find_mp4_atom(f, child_start, atom_end, path[1:])
+            if found:
+                return found
+    return None
+
+
+def _read_mp4_info(f, file_size):
+    """Duration/bitrate/channels from the MP4 mvhd atom and the first audio sample entry."""
+    mvhd = _find_mp4_atom(f, 0, file_size, [b"moov", b"mvhd"])
+    if mvhd is None:
+        return None
+    f.seek(mvhd[0])
+    version = f.read(4)[0]
+    if version == 1:
+        f.seek(16, os.SEEK_CUR)
+        timescale, length = struct.unpack(">IQ", f.read(12))
+    else:
+        f.seek(8, os.SEEK_CUR)
+        timescale, length = struct.unpack(">II", f.read(8))
+    if not timescale or not length:
+        return None
+    duration = length / timescale
+
+    channels = None
+    moov = _find_mp4_atom(f, 0, file_size, [b"moov"])
+    for kind, payload, atom_end in _iter_mp4_atoms(f, moov[0], moov[1]):
+        if kind != b"trak":
+            continue
+        entry = _find_mp4_atom(f, payload, atom_end,
+                               [b"mdia", b"minf", b"stbl", b"stsd", b"mp4a"])
+        if entry:
+            # SampleEntry (8 bytes) then reserved (8 bytes) before channelcount
+            f.seek(entry[0] + 16)
+            channels = struct.unpack(">H", f.read(2))[0]
+            break
+
+    return {"duration": duration, "bitrate": int(file_size * 8 / duration), "channels": channels}
+
+
+def _read_wav_info(f, file_size):
+    """Duration/bitrate/channels from the RIFF fmt and data chunk headers."""
+    if f.read(4) != b"RIFF":
+        return None
+    f.seek(8)
+    if f.read(4) != b"WAVE":
+        return None
+    channels = byte_rate = data_size = None
+    pos = 12
+    while pos + 8 <= file_size:
+        f.seek(pos)
+        kind, size = struct.unpack("<4sI", f.read(8))
+        if kind == b"fmt ":
+            channels, _, byte_rate = struct.unpack("<HII", f.read(12)[2:12])
+        elif kind == b"data":
+            data_size = min(size, file_size - pos - 8)
+            break
+        pos += 8 + size + (size & 1)
+    if not byte_rate or data_size is None:
+        return None
+    return {"duration": data_size / byte_rate, "bitrate": byte_rate * 8, "channels": channels}
+
+
+HEADER_PARSERS = {
+    ".mp3": _read_mp3_info,
+    ".flac": _read_flac_info,
+    ".m4a": _read_mp4_info,
+    ".mp4": _read_mp4_info,
+    ".aac": _read_mp4_info,
+    ".wav": _read_wav_info,
+}
+
+
+def read_stream_info(file_path):
+    """
+    Read duration (seconds), bitrate (bits/s) and channel count from the file
+    headers only, without touching the audio payload. Returns None if the
+    format is unsupported or the headers can't be parsed.
+    """
+    parser = HEADER_PARSERS.get(os.path.splitext(file_path)[1].lower())
+    if parser is None:
+        return None
+    try:
+        file_size = os.path.getsize(file_path)
+        with open(file_path, "rb") as f:
+            return parser(f, file_size)
+    except (OSError, struct.error, IndexError, TypeError) as e:
+        print(f"[ERROR] Header parsing failed for {file_path}: {e}")
+        return None
+
+
+def _first_text(value):
+    if hasattr(value, "text"):
+        value = value.text
+    if isinstance(value, (list, tuple)):
+        value = value[0] if value else None
+    return str(value) if value else None
+
+
+def read_tags(file_path):
+    """Read title/artist/album and whether the file carries embedded cover art."""
+    result = {"title": None, "artist": None, "album": None, "has_art": False}
+    try:
+        if file_path.lower().endswith(".mp3"):
+            # Reading the ID3 tag alone avoids mutagen's own MPEG stream scan
+            tags = ID3(file_path)
+            pictures = tags.getall("APIC")
+        else:
+            audio = MutagenFile(file_path)
+            tags = audio.tags if audio is not None else None
+            pictures = getattr(audio, "pictures", None)
+            if tags is not None and not pictures:
+                pictures = tags.getall("APIC") if hasattr(tags, "getall") else tags.get("covr")
+    except ID3NoHeaderError:
+        return result
+    except Exception as e:
+        print(f"[ERROR] Tag reading failed for {file_path}: {e}")
+        return result
+
+    if tags is not None:
+        for field, keys in TAG_KEYS.items():
+            for key in keys:
+                try:
+                    value = _first_text(tags.get(key))
+                except (KeyError, ValueError):
+                    value = None
+                if value:
+                    result[field] = value
+                    break
+    result["has_art"] = bool(pictures)
+    return result
+
+
+def read_metadata(file_path):
+    """Collect stream info and tags for a single file."""
+    stat = os.stat(file_path)
+    entry = {"mtime": stat.st_mtime, "size": stat.st_size,
+             "duration": None, "bitrate": None, "channels": None}
+    info = read_stream_info(file_path)
+    if info:
+        entry.update(info)
+    entry.update(read_tags(file_path))
+    return entry
+
+
+def is_metadata_current(entry, file_path):
+    """True if a stored metadata entry still matches the file on disk."""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return False
+    return bool(entry) and entry.get("mtime") == stat.st_mtime and entry.get("size") == stat.st_size
+
+
+def scan_metadata(folder_path, filenames, cached=None, max_workers=None):
+    """
+    Read metadata for every file in filenames (relative to folder_path) in
+    parallel. Entries in cached that still match the file on disk are reused.
+    """
+    cached = cached or {}
+    metadata = {}
+    pending = []
+    for filename in filenames:
+        full_path = os.path.join(folder_path, filename)
+        if is_metadata_current(cached.get(filename), full_path):
+            metadata[filename] = cached[filename]
+        else:
+            pending.append(filename)
+
+    def scan(filename):
+        try:
+            return filename, read_metadata(os.path.join(folder_path, filename))
+        except OSError as e:
+            print(f"[ERROR] Metadata scan failed for {filename}: {e}")
+            return filename, None
+
+    if pending:
+        workers = max_workers or min(32, (os.cpu_count() or 1) * 4)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for filename, entry in executor.map(scan, pending):
+                if entry is not None:
+                    metadata[filename] = entry
+    return metadata
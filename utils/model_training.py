@@ -0,0 +1,213 @@
+# Train the mood classifier from a folder laid out as <mood>/<audio files>
+#
+#   python -m utils.model_training path/to/labelled_music --jobs 8
+#
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import GridSearchCV, StratifiedKFold
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from utils.batch_features import EXCERPT_SECONDS, extract_features_batch
+from utils.mood_detector import (FEATURE_COUNT, MODEL_DIR, MODEL_FORMAT,
+                                 extract_audio_features, model_versions)
+from utils.pcm_cache import PCM_CACHE_ENV, PCM_CACHE_SIZE_ENV
+from utils.tag_manager import load_tags, save_tags
+
+AUDIO_EXTENSIONS = (".mp3", ".wav", ".flac", ".m4a")
+FEATURE_CACHE_FILENAME = ".feature_cache.json"
+
+PARAM_GRID = {
+    "clf__n_estimators": [200, 400],
+    "clf__max_depth": [None, 20],
+    "clf__min_samples_leaf": [1, 3],
+}
+
+
+def list_labelled_files(data_dir):
+    """Return (relative paths, labels) for every audio file under data_dir/<mood>/."""
+    paths, labels = [], []
+    for mood in sorted(os.listdir(data_dir)):
+        mood_dir = os.path.join(data_dir, mood)
+        if not os.path.isdir(mood_dir) or mood.startswith("."):
+            continue
+        for root, _, files in os.walk(mood_dir):
+            for filename in sorted(files):
+                if filename.lower().endswith(AUDIO_EXTENSIONS):
+                    paths.append(os.path.relpath(os.path.join(root, filename), data_dir))
+                    labels.append(mood.lower())
+    return paths, labels
+
+
+def _extract(full_path):
+    features = extract_audio_features(full_path)
+    return None if features is None else [float(x) for x in features]
+
+
+def _extract_batch(full_paths):
+    return [None if v is None else [float(x) for x in v] for v in extract_features_batch(full_paths)]
+
+
+def extract_feature_matrix(data_dir, paths, n_jobs=None, use_cache=True, batch_size=0):
+    """
+    Feature vectors for paths (relative to data_dir), extracted in parallel.
+    With batch_size, each worker computes batches of that many tracks with
+    utils.batch_features (BPM and key then come from the excerpt only).
+    Vectors are cached in data_dir/.feature_cache.json keyed by path and
+    reused while the file's mtime and size are unchanged and they were made
+    in the same mode. Returns the matrix and a boolean mask of the paths that
+    produced features.
+    """
+    cache_file = os.path.join(data_dir, FEATURE_CACHE_FILENAME)
+    cache = {}
+    if use_cache and os.path.exists(cache_file):
+        try:
+            cache = load_tags(cache_file)
+        except Exception as e:
+            print(f"[ERROR] Ignoring unreadable feature cache: {e}")
+
+    excerpt = EXCERPT_SECONDS if batch_size else None
+    vectors = [None] * len(paths)
+    signatures = {}
+    pending = []
+    for i, rel_path in enumerate(paths):
+        stat = os.stat(os.path.join(data_dir, rel_path))
+        signatures[rel_path] = [stat.st_mtime, stat.st_size]
+        entry = cache.get(rel_path)
+        if (entry and entry["signature"] == signatures[rel_path] and entry.get("excerpt") == excerpt
+                and len(entry["features"]) == FEATURE_COUNT):
+            vectors[i] = entry["features"]
+        else:
+            pending.append(i)
+
+    print(f"[TRAIN] {len(paths) - len(pending)} cached, {len(pending)} to extract")
+    if pending:
+        started = time.time()
+        full_paths = [os.path.join(data_dir, paths[i]) for i in pending]
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            if batch_size:
+                batches = [full_paths[i:i + batch_size] for i in range(0, len(full_paths), batch_size)]
+                results = (v for batch in executor.map(_extract_batch, batches) for v in batch)
+            else:
+                results = executor.map(_extract, full_paths, chunksize=8)
+            for done, (i, features) in enumerate(zip(pending, results), 1):
+                vectors[i] = features
+                if features is not None:
+                    cache[paths[i]] = {"signature": signatures[paths[i]], "features": features}
+                    if excerpt:
+                        cache[paths[i]]["excerpt"] = excerpt
+                if done % 500 == 0 or done == len(pending):
+                    print(f"[TRAIN] Extracted {done}/{len(pending)} ({time.time() - started:.0f}s)")
+        if use_cache:
+            save_tags(cache_file, cache)
+
+    mask = np.array([v is not None for v in vectors], dtype=bool)
+    X = np.array([v for v in vectors if v is not None], dtype=np.float64).reshape(-1, FEATURE_COUNT)
+    return X, mask
+
+
+def select_model(X, y, n_jobs=None, folds=5):
+    """Cross-validated grid search over the scaler + RandomForest pipeline."""
+    pipeline = Pipeline([
+        ("scaler", StandardScaler()),
+        ("clf", RandomForestClassifier(random_state=42, class_weight="balanced")),
+    ])
+    smallest_class = min(np.unique(y, return_counts=True)[1])
+    folds = max(2, min(folds, smallest_class))
+    search = GridSearchCV(
+        pipeline,
+        PARAM_GRID,
+        cv=StratifiedKFold(n_splits=folds, shuffle=True, random_state=42),
+        scoring="f1_macro",
+        n_jobs=n_jobs,
+    )
+    search.fit(X, y)
+    return search
+
+
+def save_model(search, X, y, model_dir=MODEL_DIR):
+    """Write the best pipeline as the next mood_model_v<N>.joblib and return its path."""
+    os.makedirs(model_dir, exist_ok=True)
+    versions = model_versions(model_dir)
+    version = max(versions) + 1 if versions else 1
+    path = os.path.join(model_dir, f"mood_model_v{version}.joblib")
+    artifact = {
+        "format": MODEL_FORMAT,
+        "version": version,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "feature_count": FEATURE_COUNT,
+        "classes": [str(c) for c in search.best_estimator_.classes_],
+        "samples": int(len(y)),
+        "cv_score": float(search.best_score_),
+        "params": search.best_params_,
+        "pipeline": search.best_estimator_,
+    }
+    tmp_path = path + ".tmp"
+    joblib.dump(artifact, tmp_path, compress=3)
+    os.replace(tmp_path, path)
+    return path
+
+
+def train_from_directory(data_dir, model_dir=MODEL_DIR, n_jobs=None, folds=5, use_cache=True, batch_size=0):
+    """Full pipeline: list files, extract features, select a model and save it."""
+    paths, labels = list_labelled_files(data_dir)
+    if not paths:
+        raise ValueError(f"No labelled audio found in {data_dir} (expected <mood>/<files>)")
+    print(f"[TRAIN] {len(paths)} files in {len(set(labels))} moods")
+
+    X, mask = extract_feature_matrix(data_dir, paths, n_jobs=n_jobs, use_cache=use_cache,
+                                     batch_size=batch_size)
+    y = np.array(labels)[mask]
+    # Stratified folds need at least two samples of every mood
+    moods, counts = np.unique(y, return_counts=True)
+    single = moods[counts < 2]
+    if len(single):
+        print(f"[TRAIN] Skipping moods with only one usable file: {', '.join(map(str, single))}")
+        keep = ~np.isin(y, single)
+        X, y = X[keep], y[keep]
+    if len(set(y)) < 2:
+        raise ValueError("Need at least two moods with usable audio to train")
+
+    started = time.time()
+    search = select_model(X, y, n_jobs=n_jobs, folds=folds)
+    print(f"[TRAIN] Best CV f1_macro {search.best_score_:.3f} with {search.best_params_} "
+          f"({time.time() - started:.0f}s)")
+    path = save_model(search, X, y, model_dir)
+    print(f"[TRAIN] Saved model to {path}")
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the mood classifier from <mood>/<files> folders.")
+    parser.add_argument("data_dir", help="directory containing one sub-folder per mood")
+    parser.add_argument("--model-dir", default=MODEL_DIR, help="where to write mood_model_v<N>.joblib")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="worker processes for extraction and cross-validation (default: all cores)")
+    parser.add_argument("--folds", type=int, default=5, help="cross-validation folds")
+    parser.add_argument("--no-cache", action="store_true", help="ignore and don't write the feature cache")
+    parser.add_argument("--batch-size", type=int, default=0,
+                        help="compute features for this many tracks at once (0: one track at a time)")
+    parser.add_argument("--pcm-cache", metavar="DIR",
+                        help="keep decoded audio in DIR so later runs skip decoding")
+    parser.add_argument("--pcm-cache-gb", type=float, default=4.0, help="size limit of the PCM cache")
+    args = parser.parse_args()
+
+    if args.pcm_cache:
+        # Set in the environment so every extraction worker picks it up
+        os.environ[PCM_CACHE_ENV] = args.pcm_cache
+        os.environ[PCM_CACHE_SIZE_ENV] = str(int(args.pcm_cache_gb * 1024 ** 3))
+
+    n_jobs = args.jobs if args.jobs else os.cpu_count()
+    train_from_directory(args.data_dir, args.model_dir, n_jobs=n_jobs,
+                         folds=args.folds, use_cache=not args.no_cache, batch_size=args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,14 @@
 import os
+import re
+import joblib
 import librosa
 import numpy as np
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import StandardScaler
+from utils.dsp_kernels import frame_descriptors
+from utils.pcm_cache import load_audio
+from utils.fingerprint import FingerprintIndex, audio_fingerprint
+from utils.content_id import content_id
 from utils.audio_utils import extract_bpm_key  # Assuming this extracts BPM and key
 
 # Mock function for extract_bpm_key if not provided
@@ -18,37 +24,49 @@ except ImportError:
         key = "major" if key_idx < 6 else "minor"  # Rough heuristic
         return tempo, key
 
+# Trained model artifacts written by utils.model_training
+MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models")
+MODEL_FILE_PATTERN = re.compile(r"^mood_model_v(\d+)\.joblib$")
+MODEL_FORMAT = 1
+# Length of the vector returned by extract_audio_features
+FEATURE_COUNT = 20
+
 def extract_audio_features(audio_path):
     """
     Extract a comprehensive set of audio features for mood classification.
     """
     try:
         # Load audio file
-        y, sr = librosa.load(audio_path, duration=30)  # Analyze first 30 seconds for efficiency
+        y, sr = load_audio(audio_path, duration=30)  # Analyze first 30 seconds for efficiency
 
         # Extract BPM and key
         bpm, key = extract_bpm_key(audio_path)
 
-        # Extract additional features
+        # Extract additional features. RMS, centroid, rolloff and ZCR come from one
+        # framing of the signal, and its spectrogram is reused for chroma and MFCCs.
+        descriptors, S = frame_descriptors(y, sr)
+        power = (S ** 2).T
+
         # 1. Energy (RMS - Root Mean Square)
-        rms = np.mean(librosa.feature.rms(y=y))
+        rms = np.mean(descriptors["rms"])
 
         # 2. Spectral Centroid (brightness of sound)
-        spectral_centroid = np.mean(librosa.feature.spectral_centroid(y=y, sr=sr))
+        spectral_centroid = np.mean(descriptors["spectral_centroid"])
 
         # 3. Spectral Roll-off (high-frequency content)
-        spectral_rolloff = np.mean(librosa.feature.spectral_rolloff(y=y, sr=sr))
+        spectral_rolloff = np.mean(descriptors["spectral_rolloff"])
 
         # 4. Zero-Crossing Rate (noisiness)
-        zero_crossing_rate = np.mean(librosa.feature.zero_crossing_rate(y=y))
+        zero_crossing_rate = np.mean(descriptors["zero_crossing_rate"])
 
         # 5. Chroma Features (harmonic content)
-        chroma = librosa.feature.chroma_stft(y=y, sr=sr)
+        chroma = librosa.feature.chroma_stft(S=power, sr=sr)
         chroma_mean = np.mean(chroma, axis=1)
         valence = np.mean(chroma_mean)  # Rough valence approximation
 
         # 6. MFCCs (timbre)
-        mfcc = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13)
+        mel = librosa.feature.melspectrogram(S=power, sr=sr)
+        mfcc = librosa.feature.mfcc(S=librosa.power_to_db(mel), sr=sr, n_mfcc=13)
         mfcc_mean = np.mean(mfcc, axis=1)
 
         # Combine features into a feature vector
@@ -89,6 +107,56 @@ def train_mood_classifier():
 
     return clf, scaler
 
+def model_versions(model_dir=MODEL_DIR):
+    """Map version number -> path for the model artifacts in model_dir."""
+    versions = {}
+    if os.path.isdir(model_dir):
+        for filename in os.listdir(model_dir):
+            match = MODEL_FILE_PATTERN.match(filename)
+            if match:
+                versions[int(match.group(1))] = os.path.join(model_dir, filename)
+    return versions
+
+def load_mood_model(model_path=None):
+    """
+    Load a trained model artifact (the latest version in MODEL_DIR by default).
+    Returns (clf, scaler), or None if there is no usable artifact.
+    """
+    if model_path is None:
+        versions = model_versions()
+        if not versions:
+            return None
+        model_path = versions[max(versions)]
+    try:
+        artifact = joblib.load(model_path)
+    except Exception as e:
+        print(f"[ERROR] Could not load mood model {model_path}: {e}")
+        return None
+    if artifact.get("format") != MODEL_FORMAT or artifact.get("feature_count") != FEATURE_COUNT:
+        print(f"[ERROR] Mood model {model_path} is incompatible with this version, ignoring it")
+        return None
+    pipeline = artifact["pipeline"]
+    print(f"[MODEL] Loaded mood model v{artifact['version']} (CV score {artifact['cv_score']:.3f})")
+    return pipeline.named_steps["clf"], pipeline.named_steps["scaler"]
+
+def get_mood_classifier(model_path=None, folder_path=None):
+    """
+    Trained model if one is available, otherwise the placeholder classifier.
+    Unless model_path is given, a model corrected by the user's retags in
+    folder_path (see utils.online_learning) takes precedence.
+    """
+    if model_path is None and folder_path is not None:
+        from utils.online_learning import CORRECTOR_FILENAME, CorrectedClassifier, load_corrector_model
+        corrected = load_corrector_model(os.path.join(folder_path, CORRECTOR_FILENAME))
+        if corrected is not None:
+            print("[MODEL] Using the mood model corrected by your retags")
+            return CorrectedClassifier(corrected), corrected["scaler"]
+    model = load_mood_model(model_path)
+    if model is None:
+        print("[MODEL] No trained mood model found, using placeholder classifier")
+        return train_mood_classifier()
+    return model
+
 def classify_mood(features, clf, scaler):
     """
     Classify mood using extracted features and a trained classifier.
@@ -101,33 +169,88 @@ def classify_mood(features, clf, scaler):
     mood = clf.predict(features_scaled)[0]
     return mood
 
-def process_folder(folder_path):
+def analyze_file(full_path, clf, scaler):
+    """
+    Classify a single audio file. Returns (mood, bpm, key, features), or None
+    if features could not be extracted.
+    """
+    # Extract features
+    features = extract_audio_features(full_path)
+    if features is None:
+        return None
+
+    # Classify mood
+    mood = classify_mood(features, clf, scaler)
+
+    # Extract BPM and key
+    bpm, key = extract_bpm_key(full_path)
+    return mood, float(bpm), key, features
+
+def process_folder(folder_path, analysis=None, model_path=None):
     """
     Process audio files in a folder and classify their mood.
+    If an analysis dict is given, each tagged file's BPM, key, feature
+    vector, content id and audio fingerprint are stored in it. Files with the
+    same audio bytes, or whose fingerprint matches one already analysed in
+    this run (another copy or encode of the same recording), reuse its result
+    instead of being analysed again.
+    """
+    filenames = [f for f in os.listdir(folder_path) if f.endswith(".mp3")]
+    return process_files(folder_path, filenames, analysis, model_path)
+
+def process_files(folder_path, filenames, analysis=None, model_path=None, known=None):
+    """
+    Classify filenames (relative to folder_path) as process_folder does.
+    known is an optional (mood_tags, analysis) pair of results from earlier
+    runs; files with the same audio as one of those reuse its result too.
     """
     # Initialize classifier and scaler
-    clf, scaler = train_mood_classifier()
+    clf, scaler = get_mood_classifier(model_path, folder_path)
 
     mood_tags = {}
-    for filename in os.listdir(folder_path):
-        if filename.endswith(".mp3"):
-            full_path = os.path.join(folder_path, filename)
-            try:
-                # Extract features
-                features = extract_audio_features(full_path)
-                if features is None:
-                    continue
-
-                # Classify mood
-                mood = classify_mood(features, clf, scaler)
-                mood_tags[filename] = mood
-
-                # Extract BPM and key for logging
-                bpm, key = extract_bpm_key(full_path)
-                print(f"[TAGGED] {filename} as {mood} (BPM={bpm:.2f}, Key={key})")
-
-            except Exception as e:
-                print(f"[ERROR] Failed to process {filename}: {e}")
+    seen = FingerprintIndex()
+    seen_files = {}
+    if known is not None:
+        known_tags, known_analysis = known
+        for song, entry in known_analysis.items():
+            if song not in known_tags or entry.get("features") is None or entry.get("bpm") is None:
+                continue
+            result = (known_tags[song], entry["bpm"], entry["key"], entry["features"])
+            if entry.get("content_id"):
+                seen_files[entry["content_id"]] = (result, entry.get("fingerprint"))
+            if entry.get("fingerprint"):
+                seen.add(entry["fingerprint"], result)
+    duplicates = 0
+    for filename in filenames:
+        full_path = os.path.join(folder_path, filename)
+        try:
+            file_id = content_id(full_path)
+            if file_id in seen_files:
+                result, fingerprint = seen_files[file_id]
+                duplicates += 1
+            else:
+                fingerprint = audio_fingerprint(full_path)
+                result = seen.find(fingerprint) if fingerprint else None
+                if result is not None:
+                    duplicates += 1
+                else:
+                    result = analyze_file(full_path, clf, scaler)
+                    if result is None:
+                        continue
+                    if fingerprint:
+                        seen.add(fingerprint, result)
+                seen_files[file_id] = (result, fingerprint)
+            mood, bpm, key, features = result
+            mood_tags[filename] = mood
+            if analysis is not None:
+                analysis[filename] = {"bpm": bpm, "key": key,
+                                      "features": [float(x) for x in features],
+                                      "content_id": file_id, "fingerprint": fingerprint}
+            print(f"[TAGGED] {filename} as {mood} (BPM={bpm:.2f}, Key={key})")
 
-    return mood_tags
+        except Exception as e:
+            print(f"[ERROR] Failed to process {filename}: {e}")
 
+    if duplicates:
+        print(f"[TAGGED] {duplicates} files were copies of already analysed recordings")
+    return mood_tags
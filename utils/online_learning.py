@@ -0,0 +1,125 @@
+# Learn from the user's mood corrections without re-extracting the library
+import os
+
+import joblib
+import numpy as np
+from sklearn.linear_model import SGDClassifier
+from sklearn.preprocessing import StandardScaler
+
+# Passes over the library when (re)fitting, and over the corrections on each retag
+FIT_EPOCHS = 5
+CORRECTION_PASSES = 10
+# A correction counts this many times more than a machine-assigned tag
+CORRECTION_WEIGHT = 20.0
+# The corrected model, saved next to mood_tags.json so new files and later sessions use it
+CORRECTOR_FILENAME = "mood_corrector.joblib"
+CORRECTOR_FORMAT = 1
+
+
+def load_corrector_model(path):
+    """The model written by MoodCorrector.save, or None if there is none or it can't be read."""
+    if not os.path.exists(path):
+        return None
+    try:
+        model = joblib.load(path)
+    except Exception as e:
+        print(f"[ERROR] Could not load corrected mood model {path}: {e}")
+        return None
+    if not isinstance(model, dict) or model.get("format") != CORRECTOR_FORMAT:
+        print(f"[ERROR] Corrected mood model {path} is incompatible with this version, ignoring it")
+        return None
+    return model
+
+
+class CorrectedClassifier:
+    """A saved corrector model as the clf of a (clf, scaler) pair for classify_mood."""
+
+    def __init__(self, model):
+        self._clf = model["clf"]
+        self._classes = np.asarray(model["classes"], dtype=object)
+
+    def predict(self, X):
+        return self._classes[self._clf.predict(X)]
+
+
+class MoodCorrector:
+    """
+    Linear mood model fitted on the library's cached feature vectors, using the
+    current tags as labels, that is nudged with partial_fit each time the user
+    corrects a tag. Refitting from scratch (needed only when a brand new mood
+    appears) is a few SGD epochs over the in-memory vectors, not a
+    re-extraction.
+
+    model is a saved model from load_corrector_model to continue from; it is
+    refitted only if the tags include a mood it doesn't know.
+    """
+
+    def __init__(self, songs, vectors, moods, corrections=None, model=None):
+        self._positions = {song: i for i, song in enumerate(songs)}
+        vectors = np.asarray(vectors, dtype=np.float64)
+        self._y = np.array(moods, dtype=object)
+        self._corrected = dict(corrections or {})
+        for song, mood in self._corrected.items():
+            if song in self._positions:
+                self._y[self._positions[song]] = mood
+        if model is not None and set(self._y.astype(str)) <= set(model["classes"]):
+            self._scaler = model["scaler"]
+            self._X = self._scaler.transform(vectors)
+            self._clf = model["clf"]
+            self._classes = np.asarray(model["classes"], dtype=object)
+            self._class_codes = {mood: code for code, mood in enumerate(self._classes)}
+            self._codes = np.array([self._class_codes[mood] for mood in self._y.astype(str)], dtype=np.int64)
+        else:
+            self._scaler = StandardScaler()
+            self._X = self._scaler.fit_transform(vectors)
+            self._fit()
+
+    def _fit(self):
+        # Integer class codes keep sklearn's label handling cheap on large libraries
+        self._classes, codes = np.unique(self._y.astype(str), return_inverse=True)
+        self._class_codes = {mood: code for code, mood in enumerate(self._classes)}
+        self._codes = codes
+        self._clf = SGDClassifier(loss="log_loss", alpha=1e-4, random_state=42)
+        rng = np.random.default_rng(42)
+        weights = np.ones(len(self._y))
+        for song in self._corrected:
+            if song in self._positions:
+                weights[self._positions[song]] = CORRECTION_WEIGHT
+        for _ in range(FIT_EPOCHS):
+            order = rng.permutation(len(self._y))
+            self._clf.partial_fit(self._X[order], codes[order], classes=np.arange(len(self._classes)),
+                                  sample_weight=weights[order])
+
+    def __contains__(self, song):
+        return song in self._positions
+
+    def learn(self, song, mood):
+        """Record that song should be tagged mood and update the model."""
+        position = self._positions[song]
+        self._y[position] = mood
+        self._corrected[song] = mood
+        if mood not in self._class_codes:
+            self._fit()
+            return
+        self._codes[position] = self._class_codes[mood]
+        corrected = [self._positions[s] for s in self._corrected if s in self._positions]
+        X = self._X[corrected]
+        y = self._codes[corrected]
+        weights = np.full(len(corrected), CORRECTION_WEIGHT)
+        for _ in range(CORRECTION_PASSES):
+            self._clf.partial_fit(X, y, sample_weight=weights)
+
+    def predict(self, songs):
+        """Predicted mood for each of songs (which must have been given at construction)."""
+        if not songs:
+            return []
+        rows = [self._positions[song] for song in songs]
+        return [str(self._classes[code]) for code in self._clf.predict(self._X[rows])]
+
+    def save(self, path):
+        """Write the model for load_corrector_model (the library's vectors are not included)."""
+        model = {"format": CORRECTOR_FORMAT, "classes": [str(c) for c in self._classes],
+                 "scaler": self._scaler, "clf": self._clf}
+        tmp_path = path + ".tmp"
+        joblib.dump(model, tmp_path)
+        os.replace(tmp_path, path)
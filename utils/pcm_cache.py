@@ -0,0 +1,119 @@
+# Optional on-disk cache of decoded audio, so re-analysis skips MP3 decoding
+import hashlib
+import os
+
+import numpy as np
+
+# Analysis sample rate (librosa.load's default); cached audio is mono float32 at this rate
+SAMPLE_RATE = 22050
+# Set to a directory to enable the cache in every process, e.g. training workers
+PCM_CACHE_ENV = "MUSIC_PLAYER_PCM_CACHE"
+PCM_CACHE_SIZE_ENV = "MUSIC_PLAYER_PCM_CACHE_BYTES"
+DEFAULT_MAX_BYTES = 4 * 1024 ** 3
+
+
+class PCMCache:
+    """
+    Decoded, resampled mono PCM stored as one .npy file per track under
+    cache_dir and opened with np.load(mmap_mode='r'), so reading back a
+    track costs a page-cache hit instead of a decode. Entries are keyed by the
+    file's path, size and mtime (an edited file is decoded again). Hits touch
+    the file's mtime and the least recently used files are deleted once the
+    directory grows past max_bytes.
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES, sr=SAMPLE_RATE):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.sr = sr
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path_for(self, audio_path):
+        stat = os.stat(audio_path)
+        identity = f"{os.path.abspath(audio_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+        digest = hashlib.blake2b(identity.encode("utf-8"), digest_size=16).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}_{self.sr}.npy")
+
+    def load(self, audio_path):
+        """Whole track as a read-only memory-mapped float32 array, decoding it on a miss."""
+        cache_path = self.path_for(audio_path)
+        try:
+            y = np.load(cache_path, mmap_mode="r")
+            os.utime(cache_path)
+            return y
+        except (OSError, ValueError):
+            pass
+
+        import librosa
+        y, _ = librosa.load(audio_path, sr=self.sr, mono=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                np.save(f, y.astype(np.float32, copy=False))
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f"[ERROR] Could not cache decoded audio for {audio_path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return y
+        self.evict()
+        try:
+            return np.load(cache_path, mmap_mode="r")
+        except OSError:
+            return y  # larger than the whole cache, so evicted straight away
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        total = 0
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if not entry.name.endswith(".npy"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)  # open memory maps of it stay valid
+            except OSError:
+                pass
+            total -= size
+
+
+_cache = [None]
+
+
+def enable_pcm_cache(cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+    """Turn the cache on for this process (usable as a pool initializer)."""
+    _cache[0] = PCMCache(cache_dir, max_bytes)
+    return _cache[0]
+
+
+def get_pcm_cache():
+    """The active cache, enabling it from the environment on first use; None if disabled."""
+    if _cache[0] is None and os.environ.get(PCM_CACHE_ENV):
+        max_bytes = int(os.environ.get(PCM_CACHE_SIZE_ENV) or DEFAULT_MAX_BYTES)
+        enable_pcm_cache(os.environ[PCM_CACHE_ENV], max_bytes)
+    return _cache[0]
+
+
+def load_audio(audio_path, duration=None):
+    """
+    Drop-in for librosa.load(audio_path, duration=duration): returns (y, sr)
+    as mono float32 at SAMPLE_RATE, served from the PCM cache when enabled.
+    """
+    cache = get_pcm_cache()
+    if cache is None:
+        import librosa
+        return librosa.load(audio_path, sr=SAMPLE_RATE, duration=duration)
+    y = cache.load(audio_path)
+    if duration is not None:
+        y = y[:int(duration * cache.sr)]
+    return np.asarray(y), cache.sr
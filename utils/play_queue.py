@@ -0,0 +1,186 @@
+# What plays next: an up-next queue in front of the current view of the library
+from collections import deque
+
+from utils.shuffle import LazyShuffle
+
+
+class PlayQueue:
+    """
+    Play order for the player. Songs the user queued (enqueue, or play_next
+    to jump the line) come first; after that playback continues through the
+    source list (the current mood filter, similar tracks or auto-DJ order) in
+    order or lazily shuffled, wrapping around at the end. Every song that
+    plays goes into a bounded history that prev() walks back through and
+    next() retraces before moving on.
+
+    The source list is used in place, not copied, and song positions in it
+    are only indexed when a jump needs them, so switching the view costs
+    nothing until a song from it is picked.
+    """
+
+    def __init__(self, source=None, history_size=500, groups_of=None):
+        self._up_next = deque()
+        self._history = deque(maxlen=history_size)
+        self._cursor = -1
+        self._groups_of = groups_of
+        self.set_source(source if source is not None else [])
+
+    def set_source(self, songs, current=None):
+        """
+        Continue playback through songs. The position starts at current (if
+        it is in songs), so next() plays what follows it; shuffle is turned off.
+        """
+        self.source = songs
+        self._positions = None
+        self._shuffle = None
+        self._position = -1
+        if current is not None:
+            self._position = self.position_of(current)
+            if self._position is None:
+                self._position = -1
+
+    def position_of(self, song):
+        """Index of song in the source list, or None."""
+        if self._positions is None:
+            self._positions = {s: i for i, s in enumerate(self.source)}
+        return self._positions.get(song)
+
+    # Up next
+
+    def enqueue(self, song):
+        self._up_next.append(song)
+
+    def play_next(self, song):
+        """Queue song ahead of everything else queued."""
+        self._up_next.appendleft(song)
+
+    def dequeue(self):
+        """Remove and return the first queued song, or None."""
+        return self._up_next.popleft() if self._up_next else None
+
+    @property
+    def up_next(self):
+        return list(self._up_next)
+
+    # Playback
+
+    @property
+    def current(self):
+        return self._history[self._cursor] if self._cursor >= 0 else None
+
+    @property
+    def shuffled(self):
+        return self._shuffle is not None
+
+    def _record(self, song):
+        # Playing something new after stepping back drops the songs that were ahead
+        while len(self._history) - 1 > self._cursor:
+            self._history.pop()
+        self._history.append(song)
+        self._cursor = len(self._history) - 1
+        return song
+
+    def jump(self, song):
+        """Play song now; source playback continues from it if it is in the source."""
+        position = self.position_of(song)
+        if position is not None:
+            self._position = position
+        return self._record(song)
+
+    def next(self, repeat_one=False):
+        """The song to play next (and make it current), or None if there is nothing to play."""
+        if repeat_one and self.current is not None:
+            return self.current
+        if self._up_next:
+            return self._record(self._up_next.popleft())
+        if self._cursor < len(self._history) - 1:
+            self._cursor += 1
+            return self._history[self._cursor]
+        if not self.source:
+            return None
+        if self._shuffle is not None:
+            self._position = self._shuffle.next()
+        else:
+            self._position = (self._position + 1) % len(self.source)
+        return self._record(self.source[self._position])
+
+    def prev(self):
+        """Step back to the previously played song; None at the start of the history."""
+        if self._cursor <= 0:
+            return None
+        self._cursor -= 1
+        return self._history[self._cursor]
+
+    def upcoming(self, count):
+        """Up to count songs that next() will reach soonest: queued, retraced history, then the source."""
+        songs = list(self._up_next)[:count]
+        songs += list(self._history)[self._cursor + 1:][:count - len(songs)]
+        wanted = min(count - len(songs), len(self.source))
+        if wanted <= 0:
+            return songs
+        if self._shuffle is not None:
+            # Draws the next few shuffle steps now; next() then plays exactly these
+            songs += [self.source[i] for i in self._shuffle.peek(wanted)]
+        else:
+            start = self._position + 1
+            songs += [self.source[(start + i) % len(self.source)] for i in range(wanted)]
+        return songs
+
+    def set_shuffle(self, on):
+        """Shuffle the source from the current position on, or go back to source order."""
+        if not on:
+            self._shuffle = None
+        elif self.source:
+            groups_of = (lambda i: self._groups_of(self.source[i])) if self._groups_of else None
+            self._shuffle = LazyShuffle(len(self.source), start=max(self._position, 0), groups_of=groups_of)
+
+    # Library changes
+
+    def add(self, song):
+        """Append a new song to the source list."""
+        self.source.append(song)
+        if self._positions is not None:
+            self._positions[song] = len(self.source) - 1
+        if self._shuffle is not None:
+            self._shuffle.grow(len(self.source))
+
+    def remove(self, song):
+        """Forget a song that left the library, wherever it is queued."""
+        if song in self._up_next:
+            self._up_next = deque(s for s in self._up_next if s != song)
+        if song in self._history:
+            self._cursor -= list(self._history)[:self._cursor + 1].count(song)
+            self._history = deque((s for s in self._history if s != song), maxlen=self._history.maxlen)
+        position = self.position_of(song)
+        if position is not None:
+            del self.source[position]
+            self._positions = None
+            if position <= self._position:
+                self._position -= 1
+            if self._shuffle is not None:
+                # Positions shifted; start a fresh shuffle from the current one
+                self.set_shuffle(True)
+
+    # Snapshots
+
+    def snapshot(self):
+        """
+        Queue state as plain data (no copy of the source list), for restore()
+        or for saving: cost depends on the queue and history, not the library.
+        """
+        return {
+            "up_next": list(self._up_next),
+            "history": list(self._history),
+            "cursor": self._cursor,
+            "position": self._position,
+            "shuffled": self._shuffle is not None,
+        }
+
+    def restore(self, state):
+        """Return to a snapshot() taken over the current source list."""
+        self._up_next = deque(state["up_next"])
+        self._history = deque(state["history"], maxlen=self._history.maxlen)
+        self._cursor = min(state["cursor"], len(self._history) - 1)
+        self._position = min(state["position"], len(self.source) - 1)
+        self._shuffle = None
+        self.set_shuffle(state["shuffled"])
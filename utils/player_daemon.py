@@ -0,0 +1,431 @@
+# Headless playback engine that keeps the library loaded and takes commands over a local socket
+#
+#   python -m utils.player_daemon serve path/to/music    (or: serve --library)
+#   python -m utils.player_daemon status
+#   python -m utils.player_daemon play ["song.mp3"] | pause | resume | next | prev | stop
+#   python -m utils.player_daemon seek 90
+#   python -m utils.player_daemon queue "song.mp3" [--next]
+#   python -m utils.player_daemon filter happy
+#
+# The GUI attaches to a running daemon instead of loading tags and opening the
+# mixer itself (see ui/remote_player.py); the protocol is described in
+# utils/daemon_client.py.
+import argparse
+import json
+import os
+import socketserver
+import threading
+
+from utils.daemon_client import DaemonClient, DaemonError, connect, daemon_address
+from utils.metadata import read_stream_info
+from utils.play_queue import PlayQueue
+
+# How often the engine checks whether the current track has ended
+END_POLL_SECONDS = 0.5
+# Most songs returned by one "songs" request
+SONGS_PAGE = 1000
+
+
+class PlayerEngine:
+    """
+    Playback and library state behind the daemon: the tags, metadata and
+    analysis of one folder or library, the mood filter, a PlayQueue and the
+    pygame mixer. Every command method returns a dict for the reply and is
+    safe to call from any thread. The player window (ui/player_gui.py) runs
+    its own engine in process when no daemon is running.
+
+    on_track(song, generation), if given, is called (on whichever thread
+    started it) each time a track starts; generation counts track starts, so
+    a listener can tell stale notifications from current ones.
+    """
+
+    def __init__(self, folder_path, mood_tags, metadata=None, analysis=None, songs=None, on_track=None):
+        from pygame import mixer
+        self._mixer = mixer
+        if not mixer.get_init():
+            mixer.init()
+        self.folder_path = folder_path
+        self.mood_tags = mood_tags
+        self.metadata = metadata if metadata is not None else {}
+        self.analysis = analysis if analysis is not None else {}
+        self.songs = list(songs) if songs is not None else list(mood_tags)
+        self.mood = "all"
+        self.view = list(self.songs)
+        self.queue = PlayQueue(self.view, groups_of=lambda song: (
+            (self.metadata.get(song) or {}).get("artist"), self.mood_tags.get(song)))
+        self.state = "stopped"
+        self.generation = 0
+        self._on_track = on_track
+        self.repeat = 0  # 0: no repeat, 1: repeat all, 2: repeat one
+        self.volume = 0.5
+        self._offset = 0.0  # seconds into the track where the mixer last started
+        self._paused_at = 0.0
+        self._lock = threading.RLock()
+        self._stopped = threading.Event()
+        mixer.music.set_volume(self.volume)
+        threading.Thread(target=self._watch_end, daemon=True).start()
+
+    # Playback
+
+    def duration(self, song):
+        info = self.metadata.get(song) or {}
+        if not info.get("duration"):
+            info = read_stream_info(os.path.join(self.folder_path, song)) or {}
+        return float(info.get("duration") or 0)
+
+    def position(self):
+        if self.state == "paused":
+            return self._paused_at
+        if self.state != "playing":
+            return 0.0
+        return self._offset + max(self._mixer.music.get_pos(), 0) / 1000
+
+    def _start(self, song, seconds=0.0):
+        if song is None:
+            raise DaemonError("No songs available to play")
+        self._mixer.music.load(os.path.join(self.folder_path, song))
+        self._mixer.music.play(start=seconds)
+        self._offset = seconds
+        self.state = "playing"
+        self.generation += 1
+        print(f"[PLAYING] {song}")
+        if self._on_track is not None:
+            self._on_track(song, self.generation)
+
+    def play(self, song=None):
+        with self._lock:
+            if song is None:
+                if self.state == "paused":
+                    return self.resume()
+                if self.state == "playing":
+                    return self.status()
+                self._start(self.queue.current or self.queue.next())
+            elif song not in self.mood_tags:
+                raise DaemonError(f"Unknown song: {song}")
+            else:
+                self._start(self.queue.jump(song))
+            return self.status()
+
+    def pause(self):
+        with self._lock:
+            if self.state == "playing":
+                self._paused_at = self.position()
+                self._mixer.music.pause()
+                self.state = "paused"
+            return self.status()
+
+    def resume(self):
+        with self._lock:
+            if self.state == "paused":
+                self._mixer.music.unpause()
+                # get_pos keeps counting from the last play(), so only the state changes
+                self.state = "playing"
+            elif self.state == "stopped":
+                return self.play()
+            return self.status()
+
+    def toggle(self):
+        return self.pause() if self.state == "playing" else self.resume()
+
+    def stop(self):
+        with self._lock:
+            self._mixer.music.stop()
+            self.state = "stopped"
+            return self.status()
+
+    def next(self):
+        with self._lock:
+            self._start(self.queue.next(repeat_one=self.repeat == 2))
+            return self.status()
+
+    def prev(self):
+        with self._lock:
+            self._start(self.queue.prev() or self.queue.current)
+            return self.status()
+
+    def seek(self, seconds):
+        with self._lock:
+            song = self.queue.current
+            if song is None:
+                raise DaemonError("Nothing is playing")
+            seconds = max(0.0, float(seconds))
+            paused = self.state == "paused"
+            self._mixer.music.play(start=seconds)
+            self._offset = seconds
+            self.state = "playing"
+            if paused:
+                self.pause()
+            return self.status()
+
+    def progress(self):
+        """(generation, state, position) of the current track, read together."""
+        with self._lock:
+            return self.generation, self.state, self.position()
+
+    @property
+    def current(self):
+        with self._lock:
+            return self.queue.current
+
+    def set_volume(self, level):
+        with self._lock:
+            self.volume = min(max(float(level), 0.0), 1.0)
+            self._mixer.music.set_volume(self.volume)
+            return self.status()
+
+    def _watch_end(self):
+        """Move on when a track finishes (the mixer only reports that it stopped being busy)."""
+        while not self._stopped.wait(END_POLL_SECONDS):
+            with self._lock:
+                if self.state == "playing" and not self._mixer.music.get_busy():
+                    try:
+                        self.next()
+                    except Exception as e:
+                        print(f"[ERROR] Failed to play next song: {e}")
+                        self.state = "stopped"
+
+    # Library and queue
+
+    def set_filter(self, mood):
+        """Show and play only songs of mood ("all" for everything); the playing song keeps playing."""
+        with self._lock:
+            mood = mood.lower()
+            view = self.songs if mood == "all" else [s for s in self.songs if self.mood_tags[s].lower() == mood]
+            if not view:
+                raise DaemonError(f"No songs found for mood: {mood}")
+            self.mood = mood
+            return self.set_view(list(view), current=self.queue.current)
+
+    def set_view(self, songs, current=None):
+        """
+        Play through songs (used in place, not copied) from current on, e.g.
+        an auto-DJ order or similar tracks; shuffle is turned off.
+        """
+        with self._lock:
+            self.view = songs
+            self.queue.set_source(self.view, current=current)
+            return self.status()
+
+    def set_shuffle(self, on):
+        """on is a JSON boolean or "on"/"off"."""
+        if on in ("on", "off"):
+            on = on == "on"
+        if not isinstance(on, bool):
+            raise DaemonError(f'shuffle takes true, false, "on" or "off", not {on!r}')
+        with self._lock:
+            self.queue.set_shuffle(on)
+            return self.status()
+
+    def set_repeat(self, mode):
+        with self._lock:
+            self.repeat = int(mode) % 3
+            return self.status()
+
+    def enqueue(self, song, next=False):
+        with self._lock:
+            if song not in self.mood_tags:
+                raise DaemonError(f"Unknown song: {song}")
+            if next:
+                self.queue.play_next(song)
+            else:
+                self.queue.enqueue(song)
+            return self.status()
+
+    def upcoming(self, count):
+        """The songs next() will reach soonest (see PlayQueue.upcoming)."""
+        with self._lock:
+            return self.queue.upcoming(count)
+
+    def add_song(self, song, in_view=False):
+        """A track that joined the library; its tags must already be in mood_tags."""
+        with self._lock:
+            self.songs.append(song)
+            if in_view:
+                self.queue.add(song)  # appends to the view
+
+    def remove_song(self, song):
+        """Forget a track that left the library, wherever it is queued."""
+        with self._lock:
+            if song in self.songs:
+                self.songs.remove(song)
+            self.queue.remove(song)  # also from the view
+
+    def list_songs(self, offset=0, limit=SONGS_PAGE):
+        """A page of the filtered view as [song, title, mood] rows."""
+        with self._lock:
+            offset, limit = int(offset), min(int(limit), SONGS_PAGE)
+            rows = [[song, self.title(song), self.mood_tags.get(song, "")]
+                    for song in self.view[offset:offset + limit]]
+            return {"total": len(self.view), "offset": offset, "songs": rows}
+
+    def moods(self):
+        return {"moods": sorted(set(mood.lower() for mood in self.mood_tags.values()))}
+
+    def title(self, song):
+        return (self.metadata.get(song) or {}).get("title") or os.path.splitext(os.path.basename(song))[0]
+
+    def status(self):
+        with self._lock:
+            song = self.queue.current
+            return {
+                "state": self.state,
+                "song": song,
+                "title": self.title(song) if song else None,
+                "mood": self.mood_tags.get(song) if song else None,
+                "position": round(self.position(), 2),
+                "duration": self.duration(song) if song else 0,
+                "filter": self.mood,
+                "shuffle": self.queue.shuffled,
+                "repeat": self.repeat,
+                "volume": self.volume,
+                "up_next": self.queue.up_next,
+            }
+
+    def close(self):
+        self._stopped.set()
+        with self._lock:
+            self._mixer.music.stop()
+            self._mixer.quit()
+
+
+# Request name -> (engine method, accepted arguments)
+COMMANDS = {
+    "status": ("status", ()),
+    "play": ("play", ("song",)),
+    "pause": ("pause", ()),
+    "resume": ("resume", ()),
+    "toggle": ("toggle", ()),
+    "stop": ("stop", ()),
+    "next": ("next", ()),
+    "prev": ("prev", ()),
+    "seek": ("seek", ("seconds",)),
+    "volume": ("set_volume", ("level",)),
+    "queue": ("enqueue", ("song", "next")),
+    "filter": ("set_filter", ("mood",)),
+    "shuffle": ("set_shuffle", ("on",)),
+    "repeat": ("set_repeat", ("mode",)),
+    "songs": ("list_songs", ("offset", "limit")),
+    "moods": ("moods", ()),
+}
+
+
+def handle_request(engine, request):
+    """Run one decoded request against engine and return the reply dict."""
+    if not isinstance(request, dict):
+        return {"ok": False, "error": "Bad request: expected a JSON object"}
+    if request.get("cmd") not in COMMANDS:
+        return {"ok": False, "error": f"Unknown command: {request.get('cmd')}"}
+    method, accepted = COMMANDS[request["cmd"]]
+    args = {name: request[name] for name in accepted if name in request}
+    try:
+        return dict(getattr(engine, method)(**args), ok=True)
+    except (DaemonError, TypeError, ValueError) as e:
+        return {"ok": False, "error": str(e)}
+    except Exception as e:
+        print(f"[ERROR] Command {request['cmd']} failed: {e}")
+        return {"ok": False, "error": str(e)}
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                reply = handle_request(self.server.engine, json.loads(line))
+            except ValueError as e:
+                reply = {"ok": False, "error": f"Bad request: {e}"}
+            self.wfile.write((json.dumps(reply) + "\n").encode("utf-8"))
+
+
+def serve(engine, address=None):
+    """Answer requests for engine on address (see daemon_address) until interrupted."""
+    address = address or daemon_address()
+    if isinstance(address, tuple):
+        server_class = socketserver.ThreadingTCPServer
+    else:
+        server_class = socketserver.ThreadingUnixStreamServer
+        if os.path.exists(address):
+            running = connect(address, timeout=1.0)
+            if running is not None:
+                running.close()
+                raise OSError(f"A player daemon is already listening on {address}")
+            os.remove(address)  # left behind by a daemon that didn't shut down cleanly
+    server_class.daemon_threads = True
+    server_class.allow_reuse_address = True
+    with server_class(address, _Handler) as server:
+        server.engine = engine
+        if not isinstance(address, tuple):
+            os.chmod(address, 0o600)
+        print(f"[DAEMON] Listening on {address}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            engine.close()
+            if not isinstance(address, tuple) and os.path.exists(address):
+                os.remove(address)
+
+
+def load_engine(folder_path=None):
+    """Engine over folder_path, or over the shared library when folder_path is None."""
+    # main sets up logging and the tagging helpers; import it only when serving
+    import main
+    if folder_path is None:
+        from utils.library import library_dir
+        store_dir = library_dir()
+        mood_tags, songs = main.process_library(store_dir)
+        if mood_tags is None:
+            raise SystemExit("Failed to load the library")
+        return PlayerEngine(store_dir, mood_tags, main.process_metadata(store_dir, songs, keep_missing=True),
+                            main.load_analysis(store_dir), songs)
+    mood_tags = main.process_mood_tags(folder_path)
+    if mood_tags is None:
+        raise SystemExit(f"Failed to load mood tags for {folder_path}")
+    return PlayerEngine(folder_path, mood_tags, main.process_metadata(folder_path, list(mood_tags)),
+                        main.load_analysis(folder_path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run or control the headless music player.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_parser = commands.add_parser("serve", help="start the daemon")
+    serve_parser.add_argument("folder", nargs="?", help="music folder to play")
+    serve_parser.add_argument("--library", action="store_true", help="play the shared multi-folder library")
+    for name in ("status", "pause", "resume", "toggle", "stop", "next", "prev", "moods"):
+        commands.add_parser(name)
+    commands.add_parser("play").add_argument("song", nargs="?")
+    commands.add_parser("seek").add_argument("seconds", type=float)
+    commands.add_parser("volume").add_argument("level", type=float, help="0.0 to 1.0")
+    queue_parser = commands.add_parser("queue")
+    queue_parser.add_argument("song")
+    queue_parser.add_argument("--next", action="store_true", help="play it before anything else queued")
+    commands.add_parser("filter").add_argument("mood")
+    commands.add_parser("shuffle").add_argument("on", choices=["on", "off"])
+    commands.add_parser("repeat").add_argument("mode", type=int, choices=[0, 1, 2])
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        if not args.folder and not args.library:
+            parser.error("give a music folder or --library")
+        serve(load_engine(None if args.library else args.folder))
+        return
+
+    request = {k: v for k, v in vars(args).items() if k != "command" and v is not None}
+    if "on" in request:
+        request["on"] = request["on"] == "on"
+    try:
+        client = DaemonClient()
+    except OSError as e:
+        raise SystemExit(f"No player daemon running at {daemon_address()}: {e}")
+    try:
+        reply = client.call(args.command, **request)
+    except DaemonError as e:
+        raise SystemExit(f"[ERROR] {e}")
+    finally:
+        client.close()
+    reply.pop("ok")
+    print(json.dumps(reply, indent=4))
+
+
+if __name__ == "__main__":
+    main()
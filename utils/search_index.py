@@ -0,0 +1,168 @@
+# In-memory word-prefix index for type-ahead search over the library
+import re
+from bisect import bisect_left, insort
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Songs added since the last build are kept in a small dict index; once this
+# many accumulate (or too many songs were removed) the arrays are rebuilt
+MAX_PENDING = 5000
+MAX_DEAD_FRACTION = 0.25
+
+
+def tokenize(text):
+    """Lower-case word tokens of a string."""
+    return TOKEN_PATTERN.findall(text.lower()) if text else []
+
+
+def _tokens_for(fields):
+    tokens = set()
+    for field in fields:
+        tokens.update(tokenize(field))
+    return tokens
+
+
+class SearchIndex:
+    """
+    Type-ahead search index. A query matches a song when every query word is a
+    prefix of some word in its fields (title, artist, album, mood), so
+    "beat mas" finds "Beat of Master".
+
+    The bulk of the index is a sorted vocabulary plus one flat array of song ids
+    grouped by token, so all songs under a prefix are a single contiguous slice
+    found by binary search. Songs added later go to a small dict index and get
+    merged in by an occasional rebuild; removed songs are masked out.
+    """
+
+    def __init__(self):
+        self._songs = []          # id -> song (None once removed)
+        self._ids = {}            # song -> id
+        self._song_tokens = {}    # id -> set of tokens
+        self._alive = np.zeros(0, dtype=bool)
+        self._dead = 0
+        # Compacted part
+        self._vocab = []          # sorted distinct tokens
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._posting_ids = np.zeros(0, dtype=np.int32)
+        # Songs added since the last rebuild
+        self._pending = {}        # token -> set of ids
+        self._pending_vocab = []  # sorted tokens of _pending
+        self._pending_count = 0
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, song):
+        return song in self._ids
+
+    @classmethod
+    def build(cls, entries):
+        """Build an index from (song, fields) pairs in one pass."""
+        index = cls()
+        for song, fields in entries:
+            index._ids[song] = len(index._songs)
+            index._song_tokens[len(index._songs)] = _tokens_for(fields)
+            index._songs.append(song)
+        index._rebuild()
+        return index
+
+    def _rebuild(self):
+        """Fold pending songs into the arrays and drop removed ones."""
+        songs = [song for song in self._songs if song is not None]
+        old_ids = [self._ids[song] for song in songs]
+        self._songs = songs
+        self._ids = {song: i for i, song in enumerate(songs)}
+        self._song_tokens = {i: self._song_tokens[old] for i, old in enumerate(old_ids)}
+
+        token_ids = {}
+        pair_tokens = []
+        pair_songs = []
+        for song_id, tokens in self._song_tokens.items():
+            for token in tokens:
+                pair_tokens.append(token_ids.setdefault(token, len(token_ids)))
+                pair_songs.append(song_id)
+
+        vocab = sorted(token_ids)
+        rank = np.empty(len(vocab), dtype=np.int64)
+        rank[[token_ids[token] for token in vocab]] = np.arange(len(vocab))
+        pair_ranks = rank[np.asarray(pair_tokens, dtype=np.int64)]
+        order = np.argsort(pair_ranks, kind="stable")
+
+        self._vocab = vocab
+        self._posting_ids = np.asarray(pair_songs, dtype=np.int32)[order]
+        self._offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(pair_ranks, minlength=len(vocab)), out=self._offsets[1:])
+        self._alive = np.ones(len(songs), dtype=bool)
+        self._dead = 0
+        self._pending = {}
+        self._pending_vocab = []
+        self._pending_count = 0
+
+    def add(self, song, fields):
+        """Index a song under the given text fields, replacing any previous entry."""
+        self.remove(song)
+        song_id = len(self._songs)
+        tokens = _tokens_for(fields)
+        self._songs.append(song)
+        self._ids[song] = song_id
+        self._song_tokens[song_id] = tokens
+        if song_id >= len(self._alive):
+            grown = np.zeros(max(2 * len(self._alive), 1024), dtype=bool)
+            grown[:len(self._alive)] = self._alive
+            self._alive = grown
+        self._alive[song_id] = True
+        for token in tokens:
+            ids = self._pending.get(token)
+            if ids is None:
+                self._pending[token] = {song_id}
+                insort(self._pending_vocab, token)
+            else:
+                ids.add(song_id)
+        self._pending_count += 1
+        if self._pending_count > MAX_PENDING:
+            self._rebuild()
+
+    def remove(self, song):
+        """Drop a song from the index."""
+        song_id = self._ids.pop(song, None)
+        if song_id is None:
+            return
+        self._songs[song_id] = None
+        self._alive[song_id] = False
+        self._dead += 1
+        for token in self._song_tokens.pop(song_id):
+            ids = self._pending.get(token)
+            if ids is not None:
+                ids.discard(song_id)
+        if self._dead > MAX_DEAD_FRACTION * max(len(self._songs), 1):
+            self._rebuild()
+
+    def _prefix_mask(self, word):
+        """Boolean mask over song ids having a token that starts with word."""
+        mask = np.zeros(len(self._alive), dtype=bool)
+        end = word + "\U0010ffff"
+        lo = bisect_left(self._vocab, word)
+        hi = bisect_left(self._vocab, end, lo)
+        if hi > lo:
+            mask[self._posting_ids[self._offsets[lo]:self._offsets[hi]]] = True
+        lo = bisect_left(self._pending_vocab, word)
+        hi = bisect_left(self._pending_vocab, end, lo)
+        for token in self._pending_vocab[lo:hi]:
+            mask[list(self._pending[token])] = True
+        return mask
+
+    def search(self, query):
+        """
+        Return the songs matching every word of query, in the order they were
+        indexed, or None if the query has no words (meaning: no filtering).
+        """
+        words = tokenize(query)
+        if not words:
+            return None
+        mask = self._alive.copy()
+        for word in set(words):
+            mask &= self._prefix_mask(word)
+        songs = self._songs
+        return [songs[i] for i in np.flatnonzero(mask)]
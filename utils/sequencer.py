@@ -0,0 +1,172 @@
+# Order tracks so consecutive songs have compatible tempo and key (auto-DJ)
+import math
+import time
+
+import numpy as np
+
+# Cost of switching between major and minor, in octaves of tempo difference
+# (0.1 is roughly the same as a 7% tempo jump)
+KEY_PENALTY = 0.1
+
+# Candidate neighbours per track for the 2-opt pass
+NEIGHBOURS = 12
+
+
+def tempo_positions(bpms):
+    """
+    Map BPMs onto a circle of circumference 1 by folding log2(bpm) into one
+    octave, so half- and double-time tracks (70 vs 140 BPM) land on the same
+    spot. Missing BPMs take the median.
+    """
+    bpms = np.asarray(bpms, dtype=np.float64)
+    known = bpms > 0
+    fill = np.median(bpms[known]) if known.any() else 120.0
+    bpms = np.where(known, bpms, fill)
+    return np.mod(np.log2(bpms), 1.0)
+
+
+def _circular(d):
+    d = np.abs(d) % 1.0
+    return np.minimum(d, 1.0 - d)
+
+
+def _neighbour_lists(x, modes, k):
+    """Approximate k cheapest successors of every track, from sorted tempo order."""
+    n = len(x)
+    candidates = []
+    for mode in (0, 1):
+        members = np.flatnonzero(modes == mode)
+        if len(members) == 0:
+            continue
+        order = members[np.argsort(x[members])]
+        span = min(k, len(order))
+        at = np.searchsorted(x[order], x)
+        offsets = np.arange(-span, span)
+        candidates.append(order[(at[:, None] + offsets) % len(order)])
+    candidates = np.concatenate(candidates, axis=1)
+    costs = (_circular(x[candidates] - x[:, None])
+             + KEY_PENALTY * (modes[candidates] != modes[:, None]))
+    costs[candidates == np.arange(n)[:, None]] = np.inf
+    take = min(k, candidates.shape[1])
+    best = np.argsort(costs, axis=1)[:, :take]
+    return np.take_along_axis(candidates, best, axis=1)
+
+
+def _find(parent, i):
+    """Root of i in a union-find forest, compressing the path on the way."""
+    root = i
+    while parent[root] != root:
+        root = parent[root]
+    while parent[i] != root:
+        parent[i], i = root, parent[i]
+    return root
+
+
+class _Unvisited:
+    """
+    Tracks of one mode in tempo order, minus the ones already visited. Visited
+    slots are merged into their neighbour with union-find, so the next
+    unvisited slot either side of a position is found without rescanning the
+    runs of tracks that share a tempo.
+    """
+
+    def __init__(self, members, x):
+        self.order = members[np.argsort(x[members], kind="stable")].tolist()
+        self.xs = x[self.order]
+        self.slot = {track: i for i, track in enumerate(self.order)}
+        self.remaining = len(self.order)
+        # right[i]: first unvisited slot >= i (len = none); left[i]: last unvisited slot < i, plus one (0 = none)
+        self._right = list(range(len(self.order) + 1))
+        self._left = list(range(len(self.order) + 1))
+
+    def remove(self, track):
+        i = self.slot[track]
+        self._right[i] = i + 1
+        self._left[i + 1] = i
+        self.remaining -= 1
+
+    def nearest(self, position):
+        """The closest unvisited tracks above and below position (wrapping around)."""
+        if not self.remaining:
+            return ()
+        size = len(self.order)
+        at = int(np.searchsorted(self.xs, position))
+        above = _find(self._right, at)
+        if above == size:
+            above = _find(self._right, 0)
+        below = _find(self._left, at)
+        if below == 0:
+            below = _find(self._left, size)
+        return self.order[above], self.order[below - 1]
+
+
+def sequence_tracks(tracks, start=None, time_budget=0.5):
+    """
+    Order tracks for smooth transitions.
+
+    tracks: list of (key, bpm, mode) where mode is "major" or "minor" as
+    reported by extract_bpm_key. Builds a nearest-neighbour path from start
+    (a track key, or the first track) and then improves it with 2-opt moves
+    over a short candidate list until no move helps or time_budget seconds
+    have passed. Returns the track keys in play order.
+    """
+    n = len(tracks)
+    if n < 3:
+        return [t[0] for t in tracks]
+    deadline = time.perf_counter() + time_budget
+    keys = [t[0] for t in tracks]
+    x = tempo_positions([t[1] or 0 for t in tracks])
+    modes = np.array([1 if t[2] == "major" else 0 for t in tracks])
+    neighbours = _neighbour_lists(x, modes, NEIGHBOURS).tolist()
+    xs = x.tolist()
+    ms = modes.tolist()
+
+    def cost(a, b):
+        d = abs(xs[a] - xs[b])
+        return min(d, 1.0 - d) + (KEY_PENALTY if ms[a] != ms[b] else 0.0)
+
+    # Nearest neighbour: the closest unvisited track of each mode is on either
+    # side of the current tempo in that mode's sorted order
+    unvisited = [_Unvisited(np.flatnonzero(modes == mode), x) for mode in (0, 1)]
+    current = keys.index(start) if start in keys else 0
+    unvisited[ms[current]].remove(current)
+    path = [current]
+    for _ in range(n - 1):
+        best = None
+        best_cost = math.inf
+        for tracks_left in unvisited:
+            for candidate in tracks_left.nearest(xs[current]):
+                c = cost(current, candidate)
+                if c < best_cost:
+                    best, best_cost = candidate, c
+        unvisited[ms[best]].remove(best)
+        path.append(best)
+        current = best
+
+    # 2-opt: reversing path[lo+1..hi] swaps edges (lo, lo+1), (hi, hi+1) for (lo, hi), (lo+1, hi+1).
+    # The first track stays fixed since it is the one currently playing.
+    tour = np.array(path)
+    position = np.empty(n, dtype=np.int64)
+    position[tour] = np.arange(n)
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for i in range(n - 1):
+            a = int(tour[i])
+            for c in neighbours[a]:
+                j = int(position[c])
+                lo, hi = (i, j) if i < j else (j, i)
+                if hi - lo < 2:
+                    continue
+                p, q, r = int(tour[lo]), int(tour[lo + 1]), int(tour[hi])
+                s = int(tour[hi + 1]) if hi + 1 < n else None
+                old = cost(p, q) + (cost(r, s) if s is not None else 0.0)
+                new = cost(p, r) + (cost(q, s) if s is not None else 0.0)
+                if new < old - 1e-12:
+                    tour[lo + 1:hi + 1] = tour[lo + 1:hi + 1][::-1].copy()
+                    position[tour[lo + 1:hi + 1]] = np.arange(lo + 1, hi + 1)
+                    improved = True
+                    break
+            if (i & 255) == 0 and time.perf_counter() >= deadline:
+                break
+    return [keys[i] for i in tour]
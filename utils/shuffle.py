@@ -0,0 +1,111 @@
+# Lazy shuffle order with a bounded play history
+import random
+from collections import deque
+
+# How many alternatives to try before accepting a back-to-back repeat of a mood/artist
+SPREAD_ATTEMPTS = 8
+
+
+class LazyShuffle:
+    """
+    Shuffled play order over indices 0..size-1, drawn one step at a time with
+    an incremental Fisher-Yates shuffle. Only swapped positions are stored, so
+    starting, stepping and toggling are O(1) regardless of the list size.
+
+    groups_of, if given, maps an index to a tuple of keys (e.g. artist, mood);
+    the shuffle then tries not to play two songs sharing a key back to back.
+    """
+
+    def __init__(self, size, start=None, history_size=500, groups_of=None, rng=None):
+        self.size = size
+        self._groups_of = groups_of
+        self._rng = rng or random.Random()
+        self._history = deque(maxlen=history_size)
+        self._cursor = -1
+        self._new_round(start)
+
+    def _new_round(self, start=None):
+        self._swaps = {}   # position -> index, for positions that differ from identity
+        self._drawn = 0
+        if start is not None:
+            self._take(start)
+            self._push(start)
+
+    def _value(self, position):
+        return self._swaps.get(position, position)
+
+    def _take(self, position):
+        """Move the value at position to the front of the undrawn part and return it."""
+        value = self._value(position)
+        self._swaps[position] = self._value(self._drawn)
+        self._swaps.pop(self._drawn, None)
+        self._drawn += 1
+        return value
+
+    def _conflicts(self, a, b):
+        if a is None or b is None:
+            return False
+        if a == b:
+            # Only possible right after a new round starts
+            return True
+        if self._groups_of is None:
+            return False
+        return any(x is not None and x == y
+                   for x, y in zip(self._groups_of(a), self._groups_of(b)))
+
+    def _draw(self):
+        remaining = self.size - self._drawn
+        # The index this draw follows: the current one, or the last peeked ahead
+        last = self._history[-1] if self._history else None
+        position = self._drawn + self._rng.randrange(remaining)
+        for _ in range(min(SPREAD_ATTEMPTS, remaining - 1)):
+            if not self._conflicts(self._value(position), last):
+                break
+            position = self._drawn + self._rng.randrange(remaining)
+        return self._take(position)
+
+    def _push(self, index):
+        self._history.append(index)
+        self._cursor = len(self._history) - 1
+
+    def grow(self, size):
+        """Extend the order to cover newly appended indices up to size-1."""
+        # Positions >= size were never swapped, so new indices join the undrawn part as-is
+        self.size = max(self.size, size)
+
+    @property
+    def current(self):
+        return self._history[self._cursor] if self._cursor >= 0 else None
+
+    def next(self):
+        """Index to play next; starts a new round once every index has been played."""
+        if self.size == 0:
+            return None
+        if self._cursor < len(self._history) - 1:
+            self._cursor += 1
+            return self._history[self._cursor]
+        if self._drawn >= self.size:
+            self._new_round()
+        index = self._draw()
+        self._push(index)
+        return index
+
+    def peek(self, count):
+        """The next count indices next() will return, drawn now so they stay the same."""
+        if self.size == 0:
+            return []
+        count = min(count, self._history.maxlen - 1)
+        while len(self._history) - 1 - self._cursor < count:
+            if self._drawn >= self.size:
+                self._new_round()
+            if len(self._history) == self._history.maxlen:
+                self._cursor -= 1  # the oldest entry is about to drop off
+            self._history.append(self._draw())
+        return [self._history[self._cursor + 1 + i] for i in range(count)]
+
+    def prev(self):
+        """Step back through the history; None once the oldest entry is reached."""
+        if self._cursor <= 0:
+            return None
+        self._cursor -= 1
+        return self._history[self._cursor]
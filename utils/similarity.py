@@ -0,0 +1,115 @@
+# Nearest-neighbour index over per-track feature vectors ("play similar")
+import numpy as np
+
+
+class SimilarityIndex:
+    """
+    Exact cosine-similarity search over standardized feature vectors.
+
+    Vectors are standardized with the library's mean/std (so BPM in the
+    hundreds doesn't drown out MFCCs), normalized to unit length and kept in a
+    single float32 matrix; a query is one matrix-vector product plus
+    argpartition, a few milliseconds for 100k tracks. Inserts append to the
+    matrix (capacity doubles as needed) and the standardization is refitted
+    whenever the library has doubled since the last fit.
+    """
+
+    def __init__(self, dim):
+        self.dim = dim
+        self._keys = []
+        self._positions = {}
+        self._raw = np.zeros((0, dim), dtype=np.float32)
+        self._unit = np.zeros((0, dim), dtype=np.float32)
+        self._mean = np.zeros(dim, dtype=np.float32)
+        self._std = np.ones(dim, dtype=np.float32)
+        self._fitted_count = 0
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return key in self._positions
+
+    @classmethod
+    def build(cls, items):
+        """Build from (key, vector) pairs; vectors must all have the same length."""
+        keys = []
+        vectors = []
+        for key, vector in items:
+            keys.append(key)
+            vectors.append(vector)
+        if not vectors:
+            return None
+        raw = np.asarray(vectors, dtype=np.float32)
+        index = cls(raw.shape[1])
+        index._keys = keys
+        index._positions = {key: i for i, key in enumerate(keys)}
+        index._raw = raw
+        index._unit = np.empty_like(raw)
+        index._refit()
+        return index
+
+    def _normalize(self, rows):
+        scaled = (rows - self._mean) / self._std
+        norms = np.linalg.norm(scaled, axis=-1, keepdims=True)
+        norms[norms == 0] = 1
+        return scaled / norms
+
+    def _refit(self):
+        n = len(self._keys)
+        if n:
+            self._mean = self._raw[:n].mean(axis=0)
+            std = self._raw[:n].std(axis=0)
+            std[std == 0] = 1
+            self._std = std
+            self._unit[:n] = self._normalize(self._raw[:n])
+        self._fitted_count = n
+
+    def add(self, key, vector):
+        """Insert or replace the vector for key."""
+        vector = np.asarray(vector, dtype=np.float32)
+        position = self._positions.get(key)
+        if position is None:
+            position = len(self._keys)
+            if position >= len(self._raw):
+                capacity = max(2 * len(self._raw), 64)
+                for name in ("_raw", "_unit"):
+                    grown = np.zeros((capacity, self.dim), dtype=np.float32)
+                    grown[:position] = getattr(self, name)[:position]
+                    setattr(self, name, grown)
+            self._keys.append(key)
+            self._positions[key] = position
+        self._raw[position] = vector
+        if len(self._keys) >= 2 * max(self._fitted_count, 1):
+            self._refit()
+        else:
+            self._unit[position] = self._normalize(vector)
+
+    def remove(self, key):
+        """Remove key by moving the last row into its slot."""
+        position = self._positions.pop(key, None)
+        if position is None:
+            return
+        last = len(self._keys) - 1
+        if position != last:
+            moved = self._keys[last]
+            self._keys[position] = moved
+            self._positions[moved] = position
+            self._raw[position] = self._raw[last]
+            self._unit[position] = self._unit[last]
+        self._keys.pop()
+
+    def most_similar(self, key, k=10):
+        """Return up to k (key, similarity) pairs closest to key, best first."""
+        position = self._positions.get(key)
+        if position is None:
+            return []
+        n = len(self._keys)
+        scores = self._unit[:n] @ self._unit[position]
+        scores[position] = -np.inf
+        k = min(k, n - 1)
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self._keys[i], float(scores[i])) for i in top]
@@ -2,6 +2,12 @@
 # ...to be implemented...
 import json
 
+MOOD_TAGS_FILENAME = "mood_tags.json"
+# Per-track BPM/key/feature vector written next to mood_tags.json
+ANALYSIS_FILENAME = "analysis.json"
+# Moods the user set by hand; these win over the classifier
+CORRECTIONS_FILENAME = "mood_corrections.json"
+
 def save_tags(filepath, tags_dict):
     with open(filepath, 'w') as f:
         json.dump(tags_dict, f, indent=4)